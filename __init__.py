@@ -32,13 +32,19 @@ bl_info = {
 
 
 
-import imp
+import importlib
 
-from . import plancher
-imp.reload(plancher)
+try:
+	import bpy
+except ImportError:                                                       # Outside of Blender, only the core module is used
+	bpy = None
+
+if bpy is not None:
+	from . import core, plancher
+	importlib.reload(core)
+	importlib.reload(plancher)
 
 
-import bpy
 import os
 import shutil
 
@@ -0,0 +1,307 @@
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+
+#############################################################
+# BENCHMARK
+#############################################################
+# Sweep the main parameters of parquet() and measure each stage :
+# layout, mesh, cut by a room outline, baked solids, vertex color and uv, and in Blender the
+# evaluation of the floor with the Solidify / Bevel modifiers against
+# the evaluation of the baked solids. For each case and stage it records
+# the wall time (best of --repeat runs), the peak memory (tracemalloc,
+# Python and NumPy allocations only), the number of boards and vertices.
+#
+# Outside of Blender the layout, the mesh buffers, the cut, the solids
+# and the colors / uv of the boards (core.board_colors(), core.board_uvs())
+# are measured :
+#   python benchmarks/bench_parquet.py --out bench.json
+# Inside Blender the mesh is filled and the color / uv stages of the
+# add-on are added (the add-on is registered if it isn't enabled) :
+#   blender -b --python benchmarks/bench_parquet.py -- --out bench.json
+#
+# The layout is built like the add-on builds it (core.layout() : the
+# pattern, the periodic floors tiled, the chunks with NUMPY), with the
+# cache cleared before each run.
+#
+# Compare with a stored baseline, exit with 1 if a stage is slower or
+# uses more memory than the baseline + tolerance :
+#   python benchmarks/bench_parquet.py --baseline baseline.json
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+	import bpy
+except ImportError:
+	bpy = None
+
+#############################################################
+# ADD-ON
+#############################################################
+# Load the add-on as a package, from the folder above this script
+
+def load_addon():
+	folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	spec = importlib.util.spec_from_file_location("plancher_addon", os.path.join(folder, "__init__.py"), submodule_search_locations=[folder])
+	addon = importlib.util.module_from_spec(spec)
+	sys.modules["plancher_addon"] = addon
+	spec.loader.exec_module(addon)
+	return addon
+
+addon = load_addon()
+core = importlib.import_module("plancher_addon.core")
+
+def register_addon():
+	"""The Plancher properties of the objects, for the stages in Blender. True if registered here"""
+	if bpy is None or hasattr(bpy.types.Object, "Plancher"):              # Outside of Blender, or the add-on is enabled
+		return False
+	try:
+		addon.register()
+	except Exception as error:
+		raise SystemExit("The Plancher add-on can't be registered (%r) : enable it, or disable the add-on in conflict" % error)
+	return True
+
+#############################################################
+# CASES
+#############################################################
+# Default values of the Plancher properties, then a larger base floor.
+# Each case changes a few parameters of the base floor.
+
+DEFAULTS = dict(lock_length=False, nbrboards=2, nbr_length=1, height=0.01, randheight=0, width=0.18, randwith=0,
+				gapx=0.01, lengthboard=2.0, gapy=0.01, shifty=0, nbrshift=1, tilt=0.0, herringbone=False, randoshifty=0,
+				floor_length=4.0, fill_gap_y=False, gaptrans=0.01, randgaptrans=0, glue=False, borders=False,
+				lengthtrans=2.0, locktrans=False, nbrtrans=1, seed=0)
+
+BASE = dict(DEFAULTS, nbrboards=50, floor_length=50.0)
+
+def cases():
+	for n in (10, 50, 100):
+		yield "nbrboards=%d" % n, dict(nbrboards=n)
+	for length in (10.0, 100.0, 1000.0):
+		yield "floor_length=%g" % length, dict(floor_length=length)
+	for n in (10, 50, 100):
+		yield "nbr_length=%d" % n, dict(lock_length=True, nbr_length=n)
+	for degrees in (0, 20, 45):
+		yield "tilt=%d" % degrees, dict(tilt=math.radians(degrees))
+	yield "herringbone", dict(herringbone=True, nbr_length=50)
+	for nbrtrans in (1, 4):
+		for locktrans in (False, True):
+			yield "fill_gap_y nbrtrans=%d locktrans=%d" % (nbrtrans, locktrans), dict(fill_gap_y=True, gapy=0.05, nbrtrans=nbrtrans, locktrans=locktrans, lengthtrans=0.5)
+	yield "glue borders", dict(glue=True, borders=True, nbrshift=3, gapx=0.05, gaptrans=0.005)
+
+#############################################################
+# STAGES
+#############################################################
+# Each stage is a function (state) -> None, the state is shared by the
+# stages of one case : layout -> mesh -> color -> uv
+# A stage with other faces than the layout (clip) puts them in
+# state["result"], they are the boards / vertices recorded for it.
+# The meshes are kept from one run to the next, their geometry is
+# cleared in each run : each run fills the mesh, like the first build of
+# a floor, not only its coordinates (update_mesh() with the same topology).
+
+def layout_params(params):
+	"""Parameters of the add-on : the ones of parquet() and the pattern"""
+	return tuple(params.values()) + ("Herringbone" if params["herringbone"] else core.DEFAULT_PATTERN,)
+
+def stage_layout(state):
+	core.cache_clear()                                                    # The first build of the floor
+	state["co"], state["sizes"] = core.layout(layout_params(state["params"]), state["engine"])
+
+def stage_mesh(state):
+	buffers = state["buffers"] = core.mesh_buffers(state["co"], state["sizes"])
+	if bpy is not None:
+		mesh = state.get("mesh")
+		if mesh is None:
+			mesh = state["mesh"] = bpy.data.meshes.new("Plancher_bench")
+		mesh.clear_geometry()
+		addon.plancher.update_mesh(mesh, *buffers)
+
+def stage_clip(state):
+	"""Floor cut by an L-shaped room over 3/4 of its surface"""
+	(x0, y0), (x1, y1) = state["co"][:, :2].min(axis=0), state["co"][:, :2].max(axis=0)
+	xm, ym = (x0 + x1) / 2, (y0 + y1) / 2
+	state["result"] = core.clip_layout(state["co"], state["sizes"], [(x0, y0), (x1, y0), (x1, ym), (xm, ym), (xm, y1), (x0, y1)])[:2]
+
+def stage_solid(state):
+	params = state["params"]
+	co, loop_verts, sizes, boards = core.board_solids(state["co"], state["sizes"], params["height"], 0.001)
+	if bpy is not None:
+		mesh = state.get("solid_mesh")
+		if mesh is None:
+			mesh = state["solid_mesh"] = bpy.data.meshes.new("Plancher_bench_solid")
+			state["solid_object"] = bpy.data.objects.new("Plancher_bench_solid", mesh)
+			bpy.context.scene.collection.objects.link(state["solid_object"])
+		mesh.clear_geometry()
+		addon.plancher.update_mesh(mesh, *core.mesh_buffers(co, sizes, loop_verts))
+
+def stage_modifiers(state):
+	"""Evaluation of the flat floor with the modifiers of create_plancher()"""
+	cobj = bench_object(state)
+	if not cobj.modifiers:
+		cobj.modifiers.new('Solidify', 'SOLIDIFY').thickness = state["params"]["height"]
+		cobj.modifiers.new('Bevel', 'BEVEL').width = 0.001
+	cobj.data.update_tag()
+	bpy.context.view_layer.update()
+
+def stage_baked(state):
+	"""Evaluation of the baked solids, no modifier"""
+	state["solid_mesh"].update_tag()
+	bpy.context.view_layer.update()
+
+def stage_board_colors(state):
+	"""Colors and groups of the boards, 10 colors (no Blender)"""
+	core.board_colors(len(state["sizes"]), 0, 10, 0, False)
+
+def stage_board_uvs(state):
+	"""UV of the loops of the flat floor (no Blender)"""
+	co, loop_verts, loop_starts, loop_totals = state["buffers"]
+	core.board_uvs(co.reshape(-1, 3)[loop_verts], loop_starts, 0, 0.5)
+
+def stage_color(state):
+	addon.plancher.plancher_colors(bench_object(state), state["mesh"])
+
+def stage_uv(state):
+	addon.plancher.plancher_uv(bench_object(state), state["mesh"])
+
+def bench_object(state):
+	"""Object linked to the scene with the mesh of the case, active and selected"""
+	cobj = state.get("object")
+	if cobj is None:
+		cobj = state["object"] = bpy.data.objects.new("Plancher_bench", state["mesh"])
+		bpy.context.scene.collection.objects.link(cobj)
+		cobj.Plancher["colrand"] = 10                                     # Direct ID property : no rebuild scheduled
+	bpy.context.view_layer.objects.active = cobj
+	cobj.select_set(True)
+	return cobj
+
+STAGES = [("layout", stage_layout), ("mesh", stage_mesh), ("clip", stage_clip), ("solid", stage_solid),
+		  ("board_colors", stage_board_colors), ("board_uvs", stage_board_uvs)]
+if bpy is not None:
+	STAGES += [("color", stage_color), ("uv", stage_uv), ("modifiers", stage_modifiers), ("baked", stage_baked)]
+
+#############################################################
+# MEASURE
+#############################################################
+
+def measure(function, state, repeat):
+	"""Best wall time of 'repeat' runs, then one run under tracemalloc for the peak"""
+	best = float("inf")
+	for i in range(repeat):
+		start = time.perf_counter()
+		function(state)
+		best = min(best, time.perf_counter() - start)
+	tracemalloc.start()
+	function(state)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return best, peak
+
+def run(engines, repeat, select=None):
+	results = []
+	for name, change in cases():
+		if select and select not in name:
+			continue
+		params = dict(BASE, **change)
+		for engine in engines:
+			state = {"engine": engine, "params": params}
+			for stage, function in STAGES:
+				state.pop("result", None)
+				seconds, peak = measure(function, state, repeat)
+				co, sizes = state.get("result", (state["co"], state["sizes"]))
+				results.append({"case": name, "engine": engine, "stage": stage, "time": seconds, "peak": peak,
+								"boards": int(len(sizes)), "verts": int(len(co)), "params": params})
+				print("%-36s %-6s %-12s %9.4fs %9.1fMB %8d boards" % (name, engine, stage, seconds, peak / 2**20, len(sizes)))
+			for key in ("object", "solid_object"):
+				if state.get(key) is not None:
+					bpy.data.objects.remove(state[key])
+			for key in ("mesh", "solid_mesh"):
+				if state.get(key) is not None:
+					bpy.data.meshes.remove(state[key])
+	return results
+
+#############################################################
+# BASELINE
+#############################################################
+# A stage is a regression if it's slower or uses more memory than the
+# baseline + tolerance. Very short stages are ignored for the time (noise).
+
+def compare(results, baseline, tolerance, min_time):
+	stored = {(r["case"], r["engine"], r["stage"]): r for r in baseline["results"]}
+	regressions = []
+	for r in results:
+		old = stored.get((r["case"], r["engine"], r["stage"]))
+		if old is None:
+			continue
+		if r["time"] > min_time and r["time"] > old["time"] * (1 + tolerance):
+			regressions.append("%s / %s / %s : time %.4fs -> %.4fs" % (r["case"], r["engine"], r["stage"], old["time"], r["time"]))
+		if r["peak"] > old["peak"] * (1 + tolerance):
+			regressions.append("%s / %s / %s : peak %d -> %d bytes" % (r["case"], r["engine"], r["stage"], old["peak"], r["peak"]))
+		if r["boards"] != old["boards"]:
+			regressions.append("%s / %s / %s : boards %d -> %d" % (r["case"], r["engine"], r["stage"], old["boards"], r["boards"]))
+	return regressions
+
+def main(argv):
+	parser = argparse.ArgumentParser(description="Benchmark of the Plancher floor generator")
+	parser.add_argument("--out", help="Write the results to this JSON file")
+	parser.add_argument("--baseline", help="Compare the results with this JSON file")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown / memory growth (0.2 = 20%%)")
+	parser.add_argument("--min-time", type=float, default=0.001, help="Ignore the time of the stages faster than this (s)")
+	parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best time is kept")
+	parser.add_argument("--loop", action="store_true", help="Also measure the loop engine (slow)")
+	parser.add_argument("--case", help="Only run the cases containing this text")
+	args = parser.parse_args(argv)
+
+	engines = ["NUMPY", "LOOP"] if args.loop else ["NUMPY"]
+	registered = register_addon()
+	try:
+		results = run(engines, args.repeat, args.case)
+	finally:
+		if registered:
+			addon.unregister()
+	report = {
+		"version": list(addon.bl_info["version"]),
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"blender": bpy.app.version_string if bpy is not None else None,
+		"machine": platform.machine(),
+		"results": results,
+		}
+	if args.out:
+		with open(args.out, "w") as f:
+			json.dump(report, f, indent=1)
+	if args.baseline:
+		with open(args.baseline) as f:
+			regressions = compare(report["results"], json.load(f), args.tolerance, args.min_time)
+		for line in regressions:
+			print("REGRESSION", line)
+		return 1 if regressions else 0
+	return 0
+
+if __name__ == "__main__":
+	argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]  # Blender passes its own arguments before '--'
+	sys.exit(main(argv))
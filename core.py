@@ -0,0 +1,1994 @@
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+#############################################################
+# CORE
+#############################################################
+# Geometry of the floor, without bpy / bmesh / mathutils : only the
+# standard library and NumPy, so it can run (and be profiled) outside
+# of Blender. The vertices are plain [x, y, z] lists (parquet) or arrays
+# (parquet_array), plancher.py converts them to the Blender mesh.
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import numpy as np
+
+#############################################################
+# RANDOM
+#############################################################
+# Counter based random values : each value is a hash of the key
+# (seed, column, row, purpose, index), so the random values of any board
+# are known without computing the boards before it. The same parameters
+# and seed always give the same floor, and the columns can be computed
+# separately. Hash = splitmix64 finalizer, in [0, 1) with 53 bits.
+# randvalue() is the scalar version (loop engine), randarray() works on
+# NumPy arrays (broadcast together) and returns the same values.
+
+RAND_HEIGHT, RAND_TRANSGAP, RAND_INTERVAL, RAND_BORDERHEIGHT, RAND_BORDERGAP, RAND_WIDTH, RAND_SHIFT, RAND_COLOR, RAND_PALETTE, RAND_GROUP, RAND_BOARD, RAND_UV = range(12)
+
+MASK = 0xFFFFFFFFFFFFFFFF
+GOLDEN = 0x9E3779B97F4A7C15
+
+def mix(z):
+	z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+	z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+	return z ^ (z >> 31)
+
+def randvalue(seed, column, row, purpose, index=0):
+	h = mix((seed + GOLDEN) & MASK)
+	for k in (column, row, purpose, index):
+		h = mix(((h ^ k) + GOLDEN) & MASK)
+	return (h >> 11) * (1.0 / 9007199254740992)
+
+def mix_array(z):
+	z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+	z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+	return z ^ (z >> np.uint64(31))
+
+def randarray(seed, column, row, purpose, index=0):
+	h = mix_array(np.atleast_1d(np.asarray(seed, dtype=np.uint64)) + np.uint64(GOLDEN))
+	for k in (column, row, purpose, index):
+		h = mix_array((h ^ np.asarray(k).astype(np.uint64)) + np.uint64(GOLDEN))
+	return (h >> np.uint64(11)) * (1.0 / 9007199254740992)
+
+def randuni(a, b, u):
+	"""Same as random.uniform(a, b) for the random value u"""
+	return a + (b - a) * u
+
+#############################################################
+# COMPUTE THE LENGTH OF THE BOARD AFTER THE TILT
+#############################################################
+# The 'Tilt' is not a rotation.
+# It's a translation of the two first vertex on X axis (translatex)
+# and a translation of the two ending vertex on the Y axis (translatey)
+# This will distord the board. So, to keep the end shape and the length
+# I compute the end shape's opposite (1) then the hypotenuse (3)
+# using the width (2) and the angle (offsetx) from the Pythagoras Theorem (yeaah trigonometry !)
+# Then, I compute the new length of the board (translatex)
+#     1
+#   *---*-----------------------           |   *----*
+#   |  /                                   |    \    \
+# 2 | / 3                                  V     \    \
+#   |/                                 translatey \    \
+#   *---------------------------                   *----*  ---> translatex
+
+def calculangle(tilt, width, lengthboard):
+
+	opposite = width * math.tan(tilt)
+	hyp = math.sqrt(width ** 2 + opposite ** 2)
+	translatex = lengthboard * math.sin(tilt)
+	translatey = math.sqrt((lengthboard ** 2) - (translatex ** 2))
+
+	return (hyp, translatex, translatey)
+
+#############################################################
+# BOARD
+#############################################################
+# Mesh of the board.
+# If the boards are tilt, we need to inverse the angle each time we call this function :
+# /\/\/ -> So each board will be upside-down compared to each other
+def board(start, left, right, end, tilt, translatex, hyp, herringbone, gapy, height, randheight, key):
+
+	gapx = 0
+	height = randheight * randuni(0, height, randvalue(*key, RAND_HEIGHT)) # Add randomness to the height of the boards
+	if not herringbone: gapy = 0
+
+	if tilt > 0:                                                          # / / / -> 1 board, 3 board, 5 board...
+		shiftdown = translatex
+		shiftup = 0
+		if herringbone:
+			gapy = gapy / 2
+			gapx = 0
+
+	else:                                                                 #  \ \ \-> 2 board, 4 board, 6 board...
+		shiftdown = 0
+		shiftup = -translatex
+		if herringbone:
+			gapy = gapy / 2
+			gapx = gapy * 2
+
+	dl = [left + shiftdown + gapx, start - gapy, height]            # down left [0,0,0]
+	dr = [right + shiftdown + gapx, start - gapy, height]           # down right [1,0,0]
+	ur = [right - shiftup + gapx, end - gapy, height]               # up right [1,1,0]
+	ul = [left - shiftup + gapx, end - gapy, height]                # up left [0,1,0]
+
+	if herringbone:
+		if tilt > 0:                                                      # / / / -> 1 board, 3 board, 5 board...
+			ur[0] = ur[0] - (hyp / 2)
+			ur[1] = ur[1] + (hyp / 2)
+			dr[0] = dr[0] - (hyp / 2)
+			dr[1] = dr[1] + (hyp / 2)
+		else:                                                             #  \ \ \-> 2 board, 4 board, 6 board...
+			dl[0] = dl[0] + (hyp / 2)
+			dl[1] = dl[1] + (hyp / 2)
+			ul[0] = ul[0] + (hyp / 2)
+			ul[1] = ul[1] + (hyp / 2)
+
+	verts = (dl, ul, ur, dr)
+
+	return (verts)
+
+#############################################################
+# TRANSVERSAL
+#############################################################
+# Creation of the boards in the interval.
+# --    -> tilt > 0 : No translation on the x axis
+# \\
+#  --   -> tilt < 0 : Translation on the x axis to follow the tilted boards
+# //
+
+def transversal(left, right, start, tilt, translatex, gapy, gapx, gaptrans, randgaptrans, end, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty, key):
+	gaptrans = gaptrans + (randgaptrans * randuni(0, gaptrans, randvalue(*key, RAND_TRANSGAP))) # Add randomness to the gap of the transversal of the boards
+	if borders: nbrtrans = 1                                              # Constrain the transversal to 1 board if borders activate
+	if gaptrans < (end-start)/(nbrtrans+1):                               # The gap can't be > to the width of the interval
+		x = 0
+		n = 0                                                             # Index of the board in the transversal (random key)
+		lengthint = 0
+		if tilt > 0: translatex = 0                                       # Constrain the board to 0 on the x axis
+		width = ((end - start) - (gaptrans * (nbrtrans + 1))) * (1 / nbrtrans)# Width of 1 board in the interval
+		startint = start + gaptrans                                       # Find the start of the first board
+		while right > lengthint:                                          # While the transversal is < to the right edge of the floor (if unlock) or the board (if locked)
+			if locktrans:                                                 # If the length of the transversal is unlock
+				lengthint += lengthtrans                                  # Add the length
+
+			if not locktrans or (lengthint > right): lengthint = right    # Constrain the length of the transversal to th length of the board (locked)
+
+			while x < nbrtrans:                                           # Nbr of boards in the transversal
+				x += 1
+				endtrans = startint + width                               # Find the end of the board
+
+				# Create the boards in the interval
+				nbvert = len(verts)
+				verts.extend(interval(left, lengthint, startint, translatex, gapy, endtrans, height, randheight, width, gapx, gaptrans, borders, endfloor, tilt, shifty, key, n))
+				n += 1
+				if shifty == 0 and borders and tilt == 0:
+					faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
+				else :
+					faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3))
+				startint = endtrans + gaptrans                            # Find the start of the next board
+
+			#------------------------------------------------------------
+			# Increment / initialize
+			#------------------------------------------------------------
+			if locktrans:
+				left = lengthint + gaptrans
+				lengthint += gaptrans
+				x = 0
+				endtrans = start + width
+				startint = start + gaptrans
+
+			# The boards can't be > to the length of the floor
+			if left > right:
+				lengthint = left
+
+
+#############################################################
+# INTERVAL
+#############################################################
+# Creation of 1 transversal
+
+def interval(left, right, start, translatex, gapy, end, height, randheight, width, gapx, gaptrans, borders, endfloor, tilt, shifty, key, index):
+	height = randheight * randuni(0, height, randvalue(*key, RAND_INTERVAL, index)) # Add randomness to the height of the boards
+	if gaptrans == gapx: bgap = 0
+	else: bgap = gaptrans
+	if shifty == 0 and borders and tilt == 0:
+		tipleft = left-gapx/2+bgap
+		tipright = right+gapx/2-bgap
+		if tipleft < 0: tipleft = 0                                       # Constrain the first left tip to 0...
+		elif tipleft > left: tipleft = left                               # ...and the other to the left of the board
+		if tipright < right: tipright = right                             # Constrain the right tips to the right of the board..
+		if endfloor > 0 : tipright = endfloor                             # ...and the last one to the last board of the floor
+		dr = [right, start, height]                                 # Down right
+		dl = [left, start, height]                                  # Down left
+		tl = [tipleft, start+(width/2), height]                     # Tip left
+		ul = [left, end, height]                                    # Up left
+		ur = [right, end, height]                                   # Up right
+		tr = [tipright, start+(width/2), height]                    # Tip right
+
+		verts = (dr, dl, tl, ul, ur, tr)
+
+	else:
+		dr = [right + translatex, start, height]                    # Down right
+		dl = [left + translatex, start, height]                     # Down left
+		ul = [left + translatex, end, height]                       # Up left
+		ur = [right + translatex, end, height]                      # Up right
+
+		verts = (dl, ul, ur, dr)
+
+	return verts
+
+#############################################################
+# BORDERS
+#############################################################
+# Creation of the borders
+
+def border(left, right, start, gapy, end, height, randheight, gaptrans, randgaptrans, floor_length, translatey, key):
+	height = randheight * randuni(0, height, randvalue(*key, RAND_BORDERHEIGHT)) # Add randomness to the height of the boards
+	gaptrans = gaptrans + (randgaptrans * randuni(0, gaptrans, randvalue(*key, RAND_BORDERGAP)))
+	tdogapy = gapy
+	tupgapy = gapy
+	if end+tupgapy > floor_length:
+		tupgapy = (floor_length - end)
+	tipdown = start-tdogapy/2+gaptrans
+	tipup = end+tupgapy/2-gaptrans
+	if tipup < end: tipup = end
+	if tipdown < 0 : tipdown = 0
+	elif tipdown > start: tipdown = start
+	td = [(left + right) /2, tipdown, height]                       # Tip down
+	tdl = [left, start, height]                                     # Tip down left
+	tup = [left, end, height]                                       # Tip up left
+	tu = [(left + right) /2, tipup, height]                         # Tip up
+	tur = [right, end, height]                                      # Tip up right
+	tdr = [right, start, height]                                    # Tip down right
+
+	verts = (td, tdl, tup, tu, tur, tdr)
+
+	return verts
+
+#############################################################
+# FLOOR BOARD
+#############################################################
+# Creation of a column of boards
+
+def parquet(lock_length, nbrboards, nbr_length, height, randheight, width, randwith, gapx, lengthboard, gapy, shifty, nbrshift, tilt, herringbone, randoshifty, floor_length, fill_gap_y, gaptrans, randgaptrans, glue, borders, lengthtrans, locktrans, nbrtrans, seed=0):
+
+	x = 0
+	y = 0
+	verts = []
+	faces = []
+	listinter = []
+	start = 0
+	left = 0
+	bool_translatey = True                                                # shifty = 0
+	end = lengthboard
+	interleft = 0
+	interright = 0
+	if locktrans:
+		shifty = 0                                                        # No shift with unlock !
+		glue = False
+		borders = False
+	if shifty: locktrans = False                                          # Can't have the boards shifted and the tranversal unlocked
+	if randoshifty > 0:                                                   # If randomness in the shift of the boards
+		randomshift = shifty * (1-randoshifty)                            # Compute the amount of randomness in the shift
+	else:
+		randomshift = shifty                                              # No randomness
+
+	if shifty > 0:
+		tilt = 0
+		herringbone = False
+
+	if gapy == 0:                                                         # If no gap on the Y axis : the transversal is not possible
+		fill_gap_y = False
+	if herringbone:                                                       # Constraints if herringbone is choose :
+		shifty = 0                                                        # - no shift
+		tilt = math.radians(45)                                           # - Tilt = 45°
+		randwith = 0                                                      # - No random on the width
+		fill_gap_y = False                                                     # - No transversal
+
+	# Compute the new length and width of the board if tilted
+	hyp, translatex, translatey = calculangle(tilt, width, lengthboard)
+
+	randwidth = hyp + (randwith * randuni(0, hyp, randvalue(seed, 1, 0, RAND_WIDTH))) # Randomness in the width
+	right = randwidth                                                     # Right = width of the board
+	end = translatey - (translatey * randuni(randomshift, shifty, randvalue(seed, 1, 0, RAND_SHIFT))) # Randomness in the length
+
+	if herringbone or lock_length:                                        # Compute the length of the floor based on the length of the boards
+		floor_length = (nbr_length * (translatey + gapy)) - gapy
+	noglue = gapx
+	#------------------------------------------------------------
+	# Loop for the boards on the X axis
+	#------------------------------------------------------------
+	while x < nbrboards:                                                  # X axis
+		x += 1
+		y = 0                                                             # Row of the board in the column (random key)
+
+		if glue and (x % nbrshift != 0):
+			gapx = gaptrans
+		else:
+			gapx = noglue
+
+
+		if (x % nbrshift != 0): bool_translatey = not bool_translatey     # Invert the shift
+		if end > floor_length :                                          # Cut the last board if it's > than the floor
+			end = floor_length
+
+		# Creation of the first board
+		nbvert = len(verts)
+		verts.extend(board(start, left, right, end, tilt, translatex, hyp, herringbone, gapy, height, randheight, (seed, x, y)))
+		faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
+
+		# Start a new column (Y)
+		start2 = end + gapy
+		end2 = start2
+		#------------------------------------------------------------
+		# TRANSVERSAL
+		#------------------------------------------------------------
+		# listinter = List of the length (left) of the interval || x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
+		# The modulo (%) is here to determined if the actual interval has to be shift
+		listinter.append(left)                                            # Keep the length of the actual interval
+		endfloor = 0
+		if x == nbrboards: endfloor = right
+		if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end < floor_length) and not locktrans:
+			if start2 > floor_length:
+				start2 = floor_length             # Cut the board if it's > than the floor
+			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty, (seed, x, y))
+		elif fill_gap_y and (x == nbrboards) and locktrans:
+			if start2 > floor_length: start2 = floor_length             # Cut the board if it's > than the floor
+			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty, (seed, x, y))
+
+		#------------------------------------------------------------
+		# BORDERS
+		#------------------------------------------------------------
+		# Create the borders in the X gap if boards are glued
+		if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
+			nbvert = len(verts)
+			verts.extend(border(right+gaptrans, right+noglue-gaptrans, start, gapy, end, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey, (seed, x, y)))
+			faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
+
+		#------------------------------------------------------------
+		# Loop for the boards on the Y axis
+		#------------------------------------------------------------
+		while floor_length > end2 :                                      # Y axis
+			end2 = start2 + translatey                                    # New column
+			if end2 > floor_length :                                     # Cut the board if it's > than the floor
+				end2 = floor_length
+
+			y += 1
+			if tilt < 0:                                                  # This part is used to inversed the tilt of the boards
+				tilt = tilt * (-1)
+			else:
+				tilt = -tilt
+
+			# Creation of the board
+			nbvert = len(verts)
+			verts.extend(board(start2, left, right, end2, tilt, translatex, hyp, herringbone, gapy, height, randheight, (seed, x, y)))
+			faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
+
+			#------------------------------------------------------------
+			# BORDERS
+			#------------------------------------------------------------
+			# Create the borders in the X gap if boards are glued
+			if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
+				nbvert = len(verts)
+				verts.extend(border(right+gaptrans, right+noglue-gaptrans, start2, gapy, end2, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey, (seed, x, y)))
+				faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
+
+			# New column
+			start2 += translatey + gapy
+
+			#------------------------------------------------------------
+			# TRANSVERSAL
+			#------------------------------------------------------------
+			# x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
+			# The modulo (%) is  here to determined if the actual interval as to be shift
+			endfloor = 0
+			if x == nbrboards: endfloor = right
+			if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end2 < floor_length) and not locktrans:
+				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
+				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty, (seed, x, y))
+
+			elif fill_gap_y and locktrans and (x == nbrboards) and (end2 < floor_length) :
+				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
+				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty, (seed, x, y))
+
+			end2 = start2                                                 # End of the loop on Y axis
+		#------------------------------------------------------------#
+
+		#------------------------------------------------------------
+		# Increment / initialize
+		#------------------------------------------------------------
+		if (x % nbrshift == 0) and not locktrans: listinter = []          # Initialize the list of interval if the nbr of boards to shift is reaches
+		if not herringbone:                                               # If not herringbone
+			left += gapx                                                  #  Add the value of gapx to the left side of the boards
+			right += gapx                                                 #  Add the value of gapx to the right side of the boards
+		else:                                                             # If herringbone, we don't use the gapx anymore in the panel
+			right += gapy * 2                                             #  used only the gapy
+			left += gapy * 2                                              #  ""     ""      ""
+		left += randwidth                                                 # Add randomness on the left side of the boards
+		randwidth = hyp + (randwith * randuni(0, hyp, randvalue(seed, x + 1, 0, RAND_WIDTH))) # Compute the new randomness on the width (hyp)
+		right += randwidth                                                # Add randomness on the right side of the boards
+		#------------------------------------------------------------#
+
+		#------------------------------------------------------------
+		# Shift on the Y axis
+		#------------------------------------------------------------
+		# bool_translatey is turn on and off at each new column to reverse the direction of the shift up or down.
+		if (bool_translatey and shifty > 0):                              # If the columns are shifted
+			if (x % nbrshift == 0 ):                                      # If the nbr of column to shift is reach
+				end = translatey * randuni(randomshift, shifty, randvalue(seed, x + 1, 0, RAND_SHIFT)) # Compute and add the randomness to the new end (translatey) shifted
+			bool_translatey = False                                       # Turn on the boolean, so it will be inverted for the next colmun
+		else:
+			if (x % nbrshift == 0 ):
+				end = translatey - (translatey * randuni(randomshift, shifty, randvalue(seed, x + 1, 0, RAND_SHIFT))) # Compute and add the randomness to the new end (translatey) shifted
+			bool_translatey = True                                        # Turn on the boolean, so it will be inverted for the next colmun
+		#------------------------------------------------------------#
+
+		#------------------------------------------------------------
+		# Herringbone only
+		#------------------------------------------------------------
+		# Invert the value of the tilted parameter
+		if tilt < 0:                                                      # The tilted value is inverted at each column
+		   tilt = tilt * (-1)                                             # so the boards will be reverse
+		#------------------------------------------------------------#
+
+	#------------------------------------------------------------         # End of the loop on X axis
+	return verts, faces
+
+#############################################################
+# FLOOR BOARD (NUMPY)
+#############################################################
+# Same floor as parquet(), but a whole column is computed at once.
+# The boards, the transversals and the borders of a column are stored in
+# (N, 4, 3) / (N, 6, 3) arrays instead of being created one by one.
+# The random values use the same keys as parquet(), so both engines
+# give the same floor for the same seed.
+
+def rowstarts(start, step, floor_length):
+	"""Start of each board of the column (Y), the last one is >= floor_length"""
+	count = max(int((floor_length - start) / step), 0) + 2
+	ys = np.add.accumulate(np.concatenate(([start], np.full(count, step))))  # Same additions as 'start2 += translatey + gapy'
+	while ys[-1] < floor_length:                                          # Go on from the last start, the same additions
+		ys = np.concatenate((ys, np.add.accumulate(np.concatenate(([ys[-1]], np.full(count, step))))[1:]))
+	return ys[:np.searchsorted(ys, floor_length) + 1]
+
+def rowcount(start, step, floor_length):
+	"""Number of starts of rowstarts(), without computing them"""
+	if start >= floor_length:
+		return 1
+	count = math.ceil((floor_length - start) / step)                      # First start >= floor_length
+	error = 4 * (count + 1) * np.finfo(float).eps * (abs(start) + (count + 1) * step) # Rounding of the additions
+	if abs(start + (count - 1) * step - floor_length) > error and abs(start + count * step - floor_length) > error:
+		return count + 1
+	return len(rowstarts(start, step, floor_length))                      # On the edge : the same additions as the loop
+
+#############################################################
+# BOARD (NUMPY)
+#############################################################
+# All the boards of a column. 'up' is True when the tilt is > 0 :
+# / / / -> 1 board, 3 board, 5 board...
+
+def board_array(start, left, right, end, up, translatex, hyp, herringbone, gapy, height):
+
+	gapx = 0
+	if herringbone:
+		gapy = gapy / 2
+		gapx = np.where(up, 0, gapy * 2)
+	else:
+		gapy = 0
+	shiftdown = np.where(up, translatex, 0)
+	shiftup = np.where(up, 0, -translatex)
+
+	co = np.empty((len(start), 4, 3))
+	co[:, :, 2] = height[:, None]
+	co[:, 0, 0] = left + shiftdown + gapx                                 # down left
+	co[:, 0, 1] = start - gapy
+	co[:, 1, 0] = left - shiftup + gapx                                   # up left
+	co[:, 1, 1] = end - gapy
+	co[:, 2, 0] = right - shiftup + gapx                                  # up right
+	co[:, 2, 1] = end - gapy
+	co[:, 3, 0] = right + shiftdown + gapx                                # down right
+	co[:, 3, 1] = start - gapy
+
+	if herringbone:
+		co[up, 2:4, 0] -= hyp / 2                                         # ur, dr
+		co[up, 2:4, 1] += hyp / 2
+		co[~up, 0:2, 0] += hyp / 2                                        # dl, ul
+		co[~up, 0:2, 1] += hyp / 2
+
+	return co
+
+#############################################################
+# TRANSVERSAL (NUMPY)
+#############################################################
+# The segments of the transversals, for all the intervals of a column.
+# Each segment is (left, right, active) with one value per interval.
+
+def transversal_segments(left, right, gaptrans, active, locktrans, lengthtrans):
+	left = np.full(len(gaptrans), float(left))
+	lengthint = np.zeros(len(gaptrans))
+	active = active & (right > lengthint)
+	segments = []
+	while active.any():
+		if locktrans:
+			lengthint = np.where(active, lengthint + lengthtrans, lengthint)
+		if not locktrans:
+			lengthint = np.where(active, right, lengthint)
+		else:
+			lengthint = np.where(active & (lengthint > right), right, lengthint)
+		segments.append((left, lengthint, active))
+		if locktrans:
+			left = np.where(active, lengthint + gaptrans, left)
+			lengthint = np.where(active, lengthint + gaptrans, lengthint)
+		lengthint = np.where(active & (left > right), left, lengthint)
+		active = active & (right > lengthint)
+	return segments
+
+def transversal_array(left, right, start, end, up, translatex, gapx, gaptrans, nbrtrans, locktrans, lengthtrans, height, randheight, borders, endfloor, six, key):
+	"""Boards of the intervals, (N, M, 6, 3) coordinates and (N, M) mask"""
+	fit = gaptrans < (end - start) / (nbrtrans + 1)
+	segments = transversal_segments(left, right, gaptrans, fit, locktrans, lengthtrans)
+	translatex = np.where(up, 0, translatex)                              # Constrain the board to 0 on the x axis
+	width = ((end - start) - (gaptrans * (nbrtrans + 1))) * (1 / nbrtrans)
+	bgap = np.where(gaptrans == gapx, 0, gaptrans)
+
+	co = np.zeros((len(start), len(segments) * nbrtrans, 6, 3))
+	present = np.zeros((len(start), len(segments) * nbrtrans), dtype=bool)
+	seed, column, row = key
+	co[:, :, :, 2] = (randheight * randuni(0, height, randarray(seed, column, row[:, None], RAND_INTERVAL, np.arange(co.shape[1]))))[:, :, None]
+	n = 0
+	for segleft, segright, active in segments:
+		startint = start + gaptrans
+		for x in range(nbrtrans):
+			endtrans = startint + width
+			present[:, n] = active
+			if six:
+				tipleft = segleft - gapx / 2 + bgap
+				tipleft = np.where(tipleft < 0, 0, np.where(tipleft > segleft, segleft, tipleft))
+				tipright = segright + gapx / 2 - bgap
+				tipright = np.where(tipright < segright, segright, tipright)
+				if endfloor > 0: tipright = np.full(len(start), endfloor)
+				co[:, n, :, 0] = np.stack((segright, segleft, tipleft, segleft, segright, tipright), axis=1)
+				co[:, n, :, 1] = np.stack((startint, startint, startint + (width / 2), endtrans, endtrans, startint + (width / 2)), axis=1)
+			else:
+				co[:, n, :4, 0] = np.stack((segleft + translatex, segleft + translatex, segright + translatex, segright + translatex), axis=1)
+				co[:, n, :4, 1] = np.stack((startint, endtrans, endtrans, startint), axis=1)
+			startint = endtrans + gaptrans
+			n += 1
+
+	return co, present
+
+#############################################################
+# BORDERS (NUMPY)
+#############################################################
+
+def border_array(left, right, start, gapy, end, height, gaptrans, floor_length):
+
+	tupgapy = np.where(end + gapy > floor_length, floor_length - end, gapy)
+	tipdown = start - gapy / 2 + gaptrans
+	tipup = end + tupgapy / 2 - gaptrans
+	tipup = np.where(tipup < end, end, tipup)
+	tipdown = np.where(tipdown < 0, 0, np.where(tipdown > start, start, tipdown))
+
+	co = np.empty((len(start), 6, 3))
+	co[:, :, 2] = height[:, None]
+	co[:, :, 0] = ((left + right) / 2, left, left, (left + right) / 2, right, right)
+	co[:, :, 1] = np.stack((tipdown, start, end, tipup, end, start), axis=1)
+
+	return co
+
+#############################################################
+# COLUMN (NUMPY)
+#############################################################
+# Flatten the faces of some rows, slot after slot, with the number of
+# faces of each row. With 'out' (co (V, 3), sizes (F,)) the faces are
+# written at the start of these buffers instead of new arrays.
+# parts = [(coordinates (N, M, nv, 3), present (N, M), nv), ...]
+
+def gather(parts, out=None):
+	rows = len(parts[0][0])
+	slots = sum(part[0].shape[1] for part in parts)
+	co = np.zeros((rows, slots, 6, 3), dtype=np.float32)
+	valid = np.zeros((rows, slots, 6), dtype=bool)
+	sizes = np.zeros((rows, slots), dtype=np.int32)
+	n = 0
+	for pco, present, nv in parts:
+		m = pco.shape[1]
+		co[:, n:n + m, :nv] = pco[:, :, :nv]
+		valid[:, n:n + m, :nv] = present[:, :, None]
+		sizes[:, n:n + m] = np.where(present, nv, 0)
+		n += m
+	if out is None:
+		return co[valid], sizes[sizes > 0], np.count_nonzero(sizes, axis=1)
+	keep = sizes > 0
+	nverts = np.count_nonzero(valid)
+	nfaces = np.count_nonzero(keep)
+	if nverts > len(out[0]) or nfaces > len(out[1]):
+		raise ValueError("Buffers too small for the floor")
+	np.compress(valid.ravel(), co.reshape(-1, 3), axis=0, out=out[0][:nverts])
+	np.compress(keep.ravel(), sizes.ravel(), out=out[1][:nfaces])
+	return out[0][:nverts], out[1][:nfaces], np.count_nonzero(sizes, axis=1)
+
+# Rows of the column : start / stop of the boards, end of the intervals,
+# the rows with a transversal and if the column has borders.
+
+def column_rows(x, end, tilt, translatex, translatey, gapx, gapy, gaptrans, nbrboards, nbrshift, fill_gap_y, locktrans, borders, glue, shifty, floor_length):
+	ys = rowstarts(end + gapy, translatey + gapy, floor_length)
+	start = np.concatenate(([0.0], ys[:-1]))
+	stop = np.concatenate(([end], np.minimum(ys[:-1] + translatey, floor_length)))
+	gapend = np.minimum(ys, floor_length)                                 # Cut the interval if it's > than the floor
+
+	trans = np.zeros(len(start), dtype=bool)
+	if fill_gap_y and not locktrans and ((x % nbrshift == 0) or (x == nbrboards)):
+		trans = stop < floor_length
+	elif fill_gap_y and locktrans and (x == nbrboards):
+		trans = stop < floor_length
+		trans[0] = True
+	bord = borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx)
+
+	return start, stop, gapend, trans, bord
+
+# The rows r0 to r1 (excluded) of the column, all the rows by default.
+# The random values are keyed on the row, so the rows of a range are the
+# same as in the whole column. 'row_faces' also returns the number of
+# faces of each row. 'out' : see gather(), the returned arrays are views
+# of the buffers.
+
+def column_array(x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed, r0=0, r1=None, row_faces=False, out=None):
+
+	#------------------------------------------------------------
+	# Rows of the column
+	#------------------------------------------------------------
+	start, stop, gapend, trans, bord = column_rows(x, end, tilt, translatex, translatey, gapx, gapy, gaptrans, nbrboards, nbrshift, fill_gap_y, locktrans, borders, glue, shifty, floor_length)
+	start, stop, gapend, trans = start[r0:r1], stop[r0:r1], gapend[r0:r1], trans[r0:r1]
+	rows = len(start)
+	row = np.arange(r0, r0 + rows)
+	up = (row % 2 == 0) & (tilt > 0)                                      # The tilt is inversed at each board
+	if borders: nbrtrans = 1                                              # Constrain the transversal to 1 board if borders activate
+	endfloor = right if x == nbrboards else 0
+
+	#------------------------------------------------------------
+	# Boards, transversals and borders
+	#------------------------------------------------------------
+	hboard = randheight * randuni(0, height, randarray(seed, x, row, RAND_HEIGHT))
+	boards = board_array(start, left, right, stop, up, translatex, hyp, herringbone, gapy, hboard)
+	parts = [(boards[:, None], np.ones((rows, 1), dtype=bool), 4)]
+
+	if bord:
+		hborder = randheight * randuni(0, height, randarray(seed, x, row, RAND_BORDERHEIGHT))
+		gborder = gaptrans + (randgaptrans * randuni(0, gaptrans, randarray(seed, x, row, RAND_BORDERGAP)))
+		co = border_array(right + gaptrans, right + noglue - gaptrans, start, gapy, stop, hborder, gborder, floor_length)
+		parts.append((co[:, None], np.ones((rows, 1), dtype=bool), 6))
+
+	first_parts = parts
+	if trans.any():
+		index = np.flatnonzero(trans)
+		g = gaptrans + (randgaptrans * randuni(0, gaptrans, randarray(seed, x, row[index], RAND_TRANSGAP)))
+		six = shifty == 0 and borders and tilt == 0
+		co, present = transversal_array(interleft, right, stop[index], gapend[index], up[index], translatex, noglue, g, nbrtrans, locktrans, lengthtrans, height, randheight, borders, endfloor, six, (seed, x, row[index]))
+		tco = np.zeros((rows,) + co.shape[1:])
+		tpresent = np.zeros((rows, co.shape[1]), dtype=bool)
+		tco[index] = co
+		tpresent[index] = present
+		nv = 6 if six else 4
+		first_parts = [parts[0], (tco[:1], tpresent[:1], nv)] + parts[1:2]  # The first row : board, transversal, border
+		parts.append((tco, tpresent, nv))                                 # The other rows : board, border, transversal
+
+	first = 1 if r0 == 0 else 0                                           # Only the row 0 has its own order
+	co0, sizes0, faces0 = gather([(pco[:first], present[:first], nv) for pco, present, nv in first_parts], out)
+	rest = None if out is None else (out[0][len(co0):], out[1][len(sizes0):]) # The other rows just after the first one
+	co1, sizes1, faces1 = gather([(pco[first:], present[first:], nv) for pco, present, nv in parts], rest)
+
+	if out is None:
+		co, sizes = np.concatenate((co0, co1)), np.concatenate((sizes0, sizes1))
+	else:
+		co, sizes = out[0][:len(co0) + len(co1)], out[1][:len(sizes0) + len(sizes1)]
+	if row_faces:
+		return co, sizes, np.concatenate((faces0, faces1))
+	return co, sizes
+
+# Number of faces and vertices of column_array(), without the coordinates :
+# the number of rows in closed form, and for the transversals only the
+# segments. Above 'limit' faces the count stops (partial, but > limit).
+
+def column_rowcount(x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed):
+	"""Number of rows of the column"""
+	return rowcount(end + gapy, translatey + gapy, floor_length)          # Closed form, the rows aren't built
+
+def column_count(x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed, limit=None):
+	rows = rowcount(end + gapy, translatey + gapy, floor_length)          # Closed form, the rows aren't built
+	bord = borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx)
+	faces = rows * 2 if bord else rows                                    # Boards (4 vertices) and borders (6 vertices)
+	verts = rows * 10 if bord else rows * 4
+	if limit is not None and faces > limit:                               # Already over : the transversals aren't counted
+		return faces, verts
+	if not fill_gap_y or not (x == nbrboards or (not locktrans and x % nbrshift == 0)):
+		return faces, verts                                               # No transversal in this column
+	start, stop, gapend, trans, bord = column_rows(x, end, tilt, translatex, translatey, gapx, gapy, gaptrans, nbrboards, nbrshift, fill_gap_y, locktrans, borders, glue, shifty, floor_length)
+	if borders: nbrtrans = 1
+	if trans.any():
+		index = np.flatnonzero(trans)
+		g = gaptrans + (randgaptrans * randuni(0, gaptrans, randarray(seed, x, index, RAND_TRANSGAP)))
+		fit = g < (gapend[index] - stop[index]) / (nbrtrans + 1)
+		nbr = sum(int(active.sum()) for segleft, segright, active in transversal_segments(interleft, right, g, fit, locktrans, lengthtrans)) * nbrtrans
+		six = shifty == 0 and borders and tilt == 0
+		faces += nbr
+		verts += nbr * (6 if six else 4)
+	return faces, verts
+
+#############################################################
+# FLOOR BOARD (NUMPY)
+#############################################################
+# Return the vertices (V, 3) and the number of vertices of each face (F),
+# the vertices of a face follow each other.
+
+def parquet_array(*params, **kwparams):
+	return column_group([column for group in parquet_columns(*params, **kwparams) for column in group])
+
+def column_group(columns, column=column_array):
+	"""Vertices and sizes of the faces of some columns"""
+	cos, sizes = zip(*[column(*args) for args in columns])
+	return np.concatenate(cos), np.concatenate(sizes)
+
+# The arguments of column_array() for each column, in groups of 'nbrshift'
+# columns. Only the left / right edges, the shift and the interval of
+# the columns are computed here, so it's cheap : the boards are
+# computed later, column by column.
+
+def parquet_columns(lock_length, nbrboards, nbr_length, height, randheight, width, randwith, gapx, lengthboard, gapy, shifty, nbrshift, tilt, herringbone, randoshifty, floor_length, fill_gap_y, gaptrans, randgaptrans, glue, borders, lengthtrans, locktrans, nbrtrans, seed=0):
+
+	x = 0
+	groups = [[]]
+	listinter = []
+	left = 0
+	bool_translatey = True
+	if locktrans:
+		shifty = 0                                                        # No shift with unlock !
+		glue = False
+		borders = False
+	if shifty: locktrans = False                                          # Can't have the boards shifted and the tranversal unlocked
+	if randoshifty > 0:                                                   # If randomness in the shift of the boards
+		randomshift = shifty * (1-randoshifty)                            # Compute the amount of randomness in the shift
+	else:
+		randomshift = shifty                                              # No randomness
+
+	if shifty > 0:
+		tilt = 0
+		herringbone = False
+
+	if gapy == 0:                                                         # If no gap on the Y axis : the transversal is not possible
+		fill_gap_y = False
+	if herringbone:                                                       # Constraints if herringbone is choose :
+		shifty = 0                                                        # - no shift
+		tilt = math.radians(45)                                           # - Tilt = 45°
+		randwith = 0                                                      # - No random on the width
+		fill_gap_y = False                                                # - No transversal
+
+	# Compute the new length and width of the board if tilted
+	hyp, translatex, translatey = calculangle(tilt, width, lengthboard)
+
+	randwidth = hyp + (randwith * randuni(0, hyp, randvalue(seed, 1, 0, RAND_WIDTH))) # Randomness in the width
+	right = randwidth                                                     # Right = width of the board
+	end = translatey - (translatey * randuni(randomshift, shifty, randvalue(seed, 1, 0, RAND_SHIFT))) # Randomness in the length
+
+	if herringbone or lock_length:                                        # Compute the length of the floor based on the length of the boards
+		floor_length = (nbr_length * (translatey + gapy)) - gapy
+	noglue = gapx
+	#------------------------------------------------------------
+	# Loop for the columns on the X axis
+	#------------------------------------------------------------
+	while x < nbrboards:
+		x += 1
+
+		if glue and (x % nbrshift != 0):
+			gapx = gaptrans
+		else:
+			gapx = noglue
+
+		if (x % nbrshift != 0): bool_translatey = not bool_translatey     # Invert the shift
+		if end > floor_length :                                          # Cut the last board if it's > than the floor
+			end = floor_length
+
+		listinter.append(left)                                            # Keep the length of the actual interval
+		groups[-1].append((x, left, right, end, listinter[0], tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed))
+
+		#------------------------------------------------------------
+		# Increment / initialize
+		#------------------------------------------------------------
+		if (x % nbrshift == 0) and not locktrans: listinter = []
+		if (x % nbrshift == 0) and x < nbrboards: groups.append([])        # New group of columns
+		if not herringbone:
+			left += gapx
+			right += gapx
+		else:
+			right += gapy * 2
+			left += gapy * 2
+		left += randwidth
+		randwidth = hyp + (randwith * randuni(0, hyp, randvalue(seed, x + 1, 0, RAND_WIDTH)))
+		right += randwidth
+
+		#------------------------------------------------------------
+		# Shift on the Y axis
+		#------------------------------------------------------------
+		if (bool_translatey and shifty > 0):
+			if (x % nbrshift == 0 ):
+				end = translatey * randuni(randomshift, shifty, randvalue(seed, x + 1, 0, RAND_SHIFT))
+			bool_translatey = False
+		else:
+			if (x % nbrshift == 0 ):
+				end = translatey - (translatey * randuni(randomshift, shifty, randvalue(seed, x + 1, 0, RAND_SHIFT)))
+			bool_translatey = True
+
+	return groups
+
+#############################################################
+# FLOOR BOARD (PARALLEL)
+#############################################################
+# The columns are split in groups of 'nbrshift' columns (a transversal
+# never crosses a group) and the groups are computed in a pool of
+# processes. The faces of a group follow each other and the vertices of
+# a face too, so the groups are joined in order and the indices of the
+# mesh buffers are offset by mesh_buffers().
+# The processes are started with 'spawn' (no fork of Blender) and kept
+# for the next floors.
+
+pool = {"executor": None, "workers": 0, "executable": None}
+
+def process_pool(workers):
+	if pool["executor"] is None or pool["workers"] != workers:
+		pool_shutdown()
+		context = multiprocessing.get_context("spawn")
+		if pool["executable"]:                                            # Blender < 2.91 : sys.executable is Blender, not Python
+			context.set_executable(pool["executable"])
+		pool["executor"] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+		pool["workers"] = workers
+	return pool["executor"]
+
+def pool_shutdown():
+	if pool["executor"] is not None:
+		pool["executor"].shutdown(wait=False)
+		pool["executor"] = None
+
+def parquet_parallel(*params, workers=None, **kwparams):
+	return groups_parallel(parquet_columns(*params, **kwparams), column_array, workers)
+
+def groups_parallel(groups, column=column_array, workers=None):
+	"""Vertices and sizes of the faces of the groups of columns, computed by column() in the pool"""
+	workers = workers or os.cpu_count() or 1
+	per_task = -(-len(groups) // (workers * 2))                           # Some tasks per process, to balance the load
+	tasks = [sum(groups[i:i + per_task], []) for i in range(0, len(groups), per_task)]
+	if workers == 1 or len(tasks) < 2:
+		return column_group(sum(tasks, []), column)
+	cos, sizes = zip(*process_pool(workers).map(partial(column_group, column=column), tasks))
+	return np.concatenate(cos), np.concatenate(sizes)
+
+#############################################################
+# FLOOR BOARD (CHUNKS)
+#############################################################
+# The floor is cut in chunks : 'chunk_rows' rows of a column. Each chunk
+# is kept in the cache, keyed on the inputs of its rows only :
+# - nbrboards only changes the last column (x == nbrboards)
+# - floor_length only changes the last rows of a column, the chunks
+#   ending 2 rows or more before the end don't depend on it
+# The random values are keyed on (seed, column, row), so a chunk is the
+# same whatever the other chunks. After an edit only the chunks with
+# new inputs are computed, the others come from the cache and the floor
+# is joined again in order.
+# The missing chunks of a column are computed in one column_array() call
+# (from the first to the last missing row) and cut with the number of
+# faces of each row.
+
+chunk_rows = 256
+
+def column_chunks(x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed):
+	"""(r0, r1, key) of the chunks of a column"""
+	rows = rowcount(end + gapy, translatey + gapy, floor_length)
+	inputs = ("CHUNK",) + layout_key((x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, x == nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, seed))
+	chunks = []
+	for r0 in range(0, rows, chunk_rows):
+		r1 = min(r0 + chunk_rows, rows)
+		last = r1 > rows - 2                                              # Depends on the length of the floor
+		chunks.append((r0, r1, inputs + (r0, r1, float(floor_length) if last else -1.0)))
+	return chunks
+
+def parquet_chunked(*params, cancel=None, **kwparams):
+	"""Vertices and sizes of the faces of the floor, from the cached chunks"""
+	cos = []
+	sizes = []
+	for group in parquet_columns(*params, **kwparams):
+		for column in group:
+			if cancel is not None and cancel():                           # Checked between the columns (background jobs)
+				raise JobCancelled()
+			chunks = column_chunks(*column)
+			found = [cache_get(key) for r0, r1, key in chunks]
+			missing = [i for i, chunk in enumerate(found) if chunk is None]
+			if missing:
+				first = chunks[missing[0]][0]
+				co, size, faces = column_array(*column, first, chunks[missing[-1]][1], row_faces=True)
+				face_ends = np.concatenate(([0], np.cumsum(faces)))       # First face of each row (from 'first')
+				vert_ends = np.concatenate(([0], np.cumsum(size)))        # First vertex of each face
+				for i in missing:
+					r0, r1, key = chunks[i]
+					f0, f1 = face_ends[r0 - first], face_ends[r1 - first]
+					found[i] = cache_put(key, co[vert_ends[f0]:vert_ends[f1]].copy(), size[f0:f1].copy())
+			for chunk in found:
+				cos.append(chunk[0])
+				sizes.append(chunk[1])
+	if not cos:
+		return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32)
+	return np.concatenate(cos), np.concatenate(sizes)
+
+#############################################################
+# FLOOR BOARD (TILES)
+#############################################################
+# With herringbone or chevron the floor is periodic : no random shift,
+# no transversal, every column has the same rows and the columns are
+# only moved along X. The X of the 4 corners of a board depends on the
+# column and on the parity of the row (the two mirrored boards of the
+# pattern), the Y only on the row. So the pair of boards is computed once
+# per column (X) and once per row (Y) and broadcast to the whole floor,
+# clipped at floor_length like the last rows of column_array(). Only the
+# random heights are computed per board. Same operations as board_array()
+# in the same order : the same floor as the other engines (the chevron
+# has no gap and no cut corner, the terms added are 0).
+
+def tiled_columns(columns):
+	"""True if the floor of these columns is periodic"""
+	x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed = columns[0]
+	if fill_gap_y or tilt <= 0:                                           # Herringbone or chevron : tilted boards
+		return False
+	if borders and glue and translatex == 0:                              # A border would follow some columns
+		return False
+	return all(column[3] == end for column in columns)                    # Same rows in every column
+
+def parquet_tiled(*params, **kwparams):
+	"""Vertices and sizes of the faces of a periodic floor, None if the floor isn't periodic"""
+	columns = [column for group in parquet_columns(*params, **kwparams) for column in group]
+	if not columns:
+		return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32)
+	if not tiled_columns(columns):
+		return None
+	x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed = columns[0]
+	start, stop, gapend, trans, bord = column_rows(x, end, tilt, translatex, translatey, gapx, gapy, gaptrans, nbrboards, nbrshift, fill_gap_y, locktrans, borders, glue, shifty, floor_length)
+	rows = len(start)
+	parity = np.arange(rows) % 2                                          # 0 : / board, 1 : \ board
+	half = hyp / 2 if herringbone else 0.0                                # Cut corners of the herringbone
+	gapy = gapy / 2 if herringbone else 0.0
+
+	#------------------------------------------------------------
+	# X : per column and parity, corners dl, ul, ur, dr
+	#------------------------------------------------------------
+	bases = np.array([(c[1], c[1], c[2], c[2]) for c in columns])        # left, left, right, right
+	shift = np.array([(translatex, 0, 0, translatex), (0, translatex, translatex, 0)])
+	gapx = np.array([0, gapy * 2])
+	hypx = np.array([(0, 0, -half, -half), (half, half, 0, 0)])
+	xs = ((bases[:, None, :] + shift) + gapx[:, None]) + hypx             # (columns, 2, 4)
+
+	#------------------------------------------------------------
+	# Y : per row
+	#------------------------------------------------------------
+	hypy = np.array([(0, 0, half, half), (half, half, 0, 0)])
+	ys = np.stack((start, stop, stop, start), axis=1) - gapy + hypy[parity]  # (rows, 4)
+
+	xcol = np.array([c[0] for c in columns])
+	co = np.empty((len(columns), rows, 4, 3), dtype=np.float32)
+	co[..., 0] = xs[:, parity]
+	co[..., 1] = ys
+	co[..., 2] = (randheight * randuni(0, height, randarray(seed, xcol[:, None], np.arange(rows), RAND_HEIGHT)))[..., None]
+	return co.reshape(-1, 3), np.full(len(columns) * rows, 4, dtype=np.int32)
+
+#############################################################
+# PROXY
+#############################################################
+# Cheap floor for the viewport : one face per column, from the left to
+# the right edge (with the tilt) and over the whole length of the floor.
+# No board, no gap, no random height.
+
+def column_proxy(x, left, right, end, interleft, tilt, translatex, translatey, hyp, herringbone, gapx, noglue, gapy, height, randheight, gaptrans, randgaptrans, nbrboards, nbrshift, nbrtrans, fill_gap_y, locktrans, lengthtrans, borders, glue, shifty, floor_length, seed):
+	right = right + translatex
+	return ((left, 0.0, 0.0), (left, floor_length, 0.0), (right, floor_length, 0.0), (right, 0.0, 0.0))
+
+def proxy_layout(params):
+	"""Vertices and sizes of the faces of the proxy of the floor (parameters with the pattern)"""
+	quads = [column_proxy(*column) for column in pattern_columns(params)]
+	co = np.array(quads, dtype=np.float32).reshape(-1, 3)
+	return co, np.full(len(quads), 4, dtype=np.int32)
+
+#############################################################
+# PREVIEW
+#############################################################
+# Small window of the floor while a value is changing : at most
+# 'columns' columns and about 'rows' boards along Y. The random values
+# are keyed on (seed, column, row), so the window is the corner of the
+# whole floor (only the last row is cut at the new length).
+
+LOCK_LENGTH, NBRBOARDS, NBR_LENGTH, LENGTHBOARD, GAPY, FLOOR_LENGTH = 0, 1, 2, 8, 9, 15 # Index in the parameters
+
+def preview_params(params, columns, rows):
+	"""Parameters of the window of the floor of params"""
+	params = list(params)
+	params[NBRBOARDS] = min(params[NBRBOARDS], columns)
+	params[NBR_LENGTH] = min(params[NBR_LENGTH], rows)                    # Length from the boards (lock_length, herringbone)
+	params[FLOOR_LENGTH] = min(params[FLOOR_LENGTH], rows * (params[LENGTHBOARD] + params[GAPY]))
+	return tuple(params)
+
+#############################################################
+# FLOOR BOARD (STREAM)
+#############################################################
+# The floor in chunks of about 'chunk' boards : only one chunk is in
+# memory at once, so an exporter or a statistics pass can go through a
+# floor of any size. The floor is given by the parameters of the add-on
+# (with the name of the pattern) and built by its pattern, like
+# pattern_array(). The small columns are put together, the long ones are
+# cut in ranges of rows ("rows" of the pattern, then its "column" with
+# r0, r1 : 1 board or more per row ; a pattern without "rows" gives its
+# columns whole). parquet_into() writes the ranges directly in buffers
+# given by the caller (co (V, 3), sizes (F,)).
+
+def column_ranges(pattern, columns, chunk):
+	"""(column, r0, r1) : the rows of the columns in ranges of at most 'chunk' rows"""
+	for column in columns:
+		rows = pattern["rows"](*column) if pattern["rows"] is not None else 1 # Else the column in one range
+		for r0 in range(0, rows, chunk):
+			yield column, r0, min(r0 + chunk, rows)
+
+def column_range(pattern, column, r0, r1, out=None):
+	"""Vertices and sizes of the rows r0 to r1 of the column, written in 'out' (co, sizes) if given"""
+	if pattern["rows"] is not None:
+		return pattern["column"](*column, r0, r1, out=out)
+	co, sizes = pattern["column"](*column)                                # The whole column
+	if out is not None:
+		out[0][:len(co)] = co
+		out[1][:len(sizes)] = sizes
+	return co, sizes
+
+def parquet_stream(params, chunk=4096):
+	"""Yield the vertices and the sizes of the faces of the floor, chunk by chunk"""
+	pattern, args = pattern_params(params)
+	cos = []
+	sizes = []
+	nbr = 0
+	for group in pattern["columns"](*args):
+		for column in group:
+			rows = pattern["rows"](*column) if pattern["rows"] is not None else 1
+			r0 = 0
+			while r0 < rows:
+				r1 = min(r0 + max(chunk - nbr, 1), rows)                  # The rest of the chunk, at least 1 board per row
+				co, size = column_range(pattern, column, r0, r1)
+				cos.append(co)
+				sizes.append(size)
+				nbr += len(size)
+				r0 = r1
+				if nbr >= chunk:
+					yield np.concatenate(cos), np.concatenate(sizes)
+					cos = []
+					sizes = []
+					nbr = 0
+	if cos:
+		yield np.concatenate(cos), np.concatenate(sizes)
+
+def parquet_into(co, sizes, params, chunk=4096):
+	"""Write the floor in the buffers co / sizes, return the number of vertices and faces"""
+	pattern, args = pattern_params(params)
+	nverts = 0
+	nfaces = 0
+	for group in pattern["columns"](*args):
+		for column, r0, r1 in column_ranges(pattern, group, chunk):       # Each range written in place, after the previous one
+			range_co, range_sizes = column_range(pattern, column, r0, r1, out=(co[nverts:], sizes[nfaces:]))
+			nverts += len(range_co)
+			nfaces += len(range_sizes)
+	return nverts, nfaces
+
+#############################################################
+# SIZE OF THE FLOOR
+#############################################################
+# Number of boards (1 face per board) and vertices of a floor, counted
+# column by column before any board is built. So a floor over the budget
+# (a stray floor length of 10 km...) is refused before Blender freezes.
+# The count only gates the builds : the layouts are still joined from
+# their columns (layout()), parquet_into() is the one that fills buffers
+# of the counted size.
+# 'limit' stops the count as soon as the floor has more boards.
+
+budget = {"boards": 1000000, "refuse": True}
+
+def parquet_count(*params, limit=None, **kwparams):
+	"""Number of faces and vertices of the floor (exact, or > limit)"""
+	return columns_count(parquet_columns(*params, **kwparams), column_count, limit)
+
+def columns_count(groups, count=column_count, limit=None):
+	"""Number of faces and vertices of the groups of columns, counted by count()"""
+	faces = 0
+	verts = 0
+	for group in groups:
+		for column in group:
+			f, v = count(*column, limit=None if limit is None else limit - faces)
+			faces += f
+			verts += v
+			if limit is not None and faces > limit:
+				return faces, verts
+	return faces, verts
+
+def layout_bytes(faces, verts):
+	"""Memory of a layout : float32 vertices and int32 sizes"""
+	return verts * 3 * 4 + faces * 4
+
+def over_budget(params):
+	"""None if the floor fits in the budget, else its (partial) count of faces / vertices"""
+	if budget["boards"] <= 0:                                             # No budget
+		return None
+	if layout_cached(params):                                             # Already computed
+		return None
+	faces, verts = pattern_count(params, limit=budget["boards"])
+	if faces <= budget["boards"]:
+		return None
+	return faces, verts
+
+def pydata_to_array(verts, faces):
+	"""Convert the verts / faces of parquet() to the arrays of parquet_array()"""
+	co = np.array([tuple(v) for v in verts], dtype=np.float32).reshape(-1, 3)
+	sizes = np.fromiter(map(len, faces), dtype=np.int32, count=len(faces))
+	return co, sizes
+
+#############################################################
+# PATTERNS
+#############################################################
+# Each type of floor (floor_type) is a pattern : a generator with the
+# contract of the parquet engine, so a new pattern gets the mesh build,
+# the cache, the background jobs, the budget, the proxy and the parallel
+# engine. A pattern is a dict :
+# - "params"  : (params) -> parameters of the generator, the constraints
+#               of the pattern on the parameters of parquet(), or None
+# - "columns" : (*params) -> groups of columns (a group is never split
+#               between the processes). A column is a tuple with left,
+#               right, translatex and floor_length at the same place as
+#               in parquet_columns() (used by the proxy)
+# - "column"  : (*column) -> vertices (V, 3) float32 and number of
+#               vertices of each face (F,) int32, the vertices of a face
+#               follow each other
+# - "count"   : (*column) -> exact number of faces and vertices of the
+#               column, without computing the vertices
+# - "rows"    : (*column) -> number of rows of the column, "column" then
+#               takes r0, r1 and out like column_array() (the stream), or
+#               None
+# - "tiled"   : (*params) -> layout of a periodic floor, or None (optional)
+# - "chunked" : (*params, cancel) -> layout from the cached chunks, for
+#               the NUMPY engine (optional)
+# - "loop"    : (*params) -> (verts, faces) for the LOOP engine (optional)
+# The parameters of a floor are the ones of parquet() followed by the
+# name of the pattern. The pattern decides of the herringbone flag of
+# parquet() ; without a name (the parameters of parquet() only) the flag
+# picks Herringbone or the default pattern.
+
+PATTERN = 25                                                              # Index of the pattern in the parameters
+WIDTH, RANDWITH, SHIFTY, TILT, HERRINGBONE, FILL_GAP_Y = 5, 6, 10, 12, 13, 16 # Index in the parameters
+DEFAULT_PATTERN = "Stack Bond"
+CHEVRON_TILT = math.radians(45)                                           # Tilt of a chevron set to 0
+
+patterns = OrderedDict()
+
+def register_pattern(name, index, description, params=None, columns=parquet_columns, column=column_array, count=column_count, rows=column_rowcount, tiled=None, chunked=None, loop=None):
+	"""Add the pattern 'name', index = value of floor_type in the .blend files"""
+	patterns[name] = {"index": index, "description": description, "params": params, "columns": columns, "column": column,
+					  "count": count, "rows": rows, "tiled": tiled, "chunked": chunked, "loop": loop}
+
+def pattern_params(params):
+	"""The pattern of the parameters of a floor and the parameters of its generator"""
+	params = tuple(params)
+	if len(params) > PATTERN:
+		pattern = patterns[params[PATTERN]]
+	else:
+		pattern = patterns["Herringbone" if params[HERRINGBONE] else DEFAULT_PATTERN]
+	params = params[:PATTERN]
+	if pattern["params"] is not None:
+		params = tuple(pattern["params"](params))
+	return pattern, params
+
+def pattern_columns(params):
+	"""All the columns of the floor"""
+	pattern, params = pattern_params(params)
+	return [column for group in pattern["columns"](*params) for column in group]
+
+def pattern_array(params, cancel=None):
+	"""Vertices and sizes of the faces of the floor, column by column"""
+	pattern, args = pattern_params(params)
+	cos = []
+	sizes = []
+	for group in pattern["columns"](*args):
+		for column in group:
+			if cancel is not None and cancel():
+				raise JobCancelled()
+			co, size = pattern["column"](*column)
+			cos.append(co)
+			sizes.append(size)
+	if not cos:
+		return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32)
+	return np.concatenate(cos), np.concatenate(sizes)
+
+def pattern_count(params, limit=None):
+	"""Number of faces and vertices of the floor (exact, or > limit)"""
+	pattern, args = pattern_params(params)
+	return columns_count(pattern["columns"](*args), pattern["count"], limit)
+
+# The patterns of parquet() : the same generator with some constraints.
+# Tiles and Fougere (values 1 and 5 of the old floor_type) never had a
+# generator of their own : they are built as Squares and Chevron, so the
+# files using them still open.
+
+def herringbone_params(params):
+	params = list(params)
+	params[HERRINGBONE] = True
+	params[SHIFTY] = 0                                                    # A shift turns the herringbone off in parquet()
+	return params
+
+def chevron_params(params):
+	params = list(params)
+	params[HERRINGBONE] = False
+	params[SHIFTY] = 0                                                    # The boards are tilted by 'tilt'
+	if params[TILT] <= 0:                                                 # Else the same floor as Stack Bond
+		params[TILT] = CHEVRON_TILT
+	return params
+
+def ladder_params(params):
+	params = list(params)
+	params[HERRINGBONE] = False
+	params[SHIFTY] = 0
+	params[TILT] = 0.0
+	params[FILL_GAP_Y] = True                                             # The rungs : transversals in the gaps (Gap Y > 0)
+	return params
+
+def stack_bond_params(params):
+	params = list(params)
+	params[HERRINGBONE] = False                                           # Herringbone is a pattern of its own
+	return params
+
+def squares_params(params):
+	params = list(params)
+	params[LENGTHBOARD] = params[WIDTH]                                   # Square boards
+	params[RANDWITH] = 0
+	params[SHIFTY] = 0
+	params[TILT] = 0.0
+	params[HERRINGBONE] = False
+	return params
+
+register_pattern("Herringbone", 0, "Herringbone : boards at 45\u00b0 fitted in zigzag", herringbone_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Tiles", 1, "Tiles : square tiles in a grid (built as Squares)", squares_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Squares", 2, "Squares : square boards (length = width) in a grid", squares_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Chevron", 3, "Chevron : boards tilted by Tilt (45\u00b0 if 0), one row out of two mirrored", chevron_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Ladder", 4, "Ladder : columns of boards with transversals in the gaps (needs Gap Y)", ladder_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Fougere", 5, "Fougere : boards in zigzag (built as Chevron)", chevron_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+register_pattern("Stack Bond", 6, "Stack Bond : columns of boards, with the shift, the transversals and the borders", stack_bond_params, tiled=parquet_tiled, chunked=parquet_chunked, loop=parquet)
+
+#############################################################
+# CACHE
+#############################################################
+# The last layouts (vertices, sizes), keyed on all the parameters of
+# parquet() with the seed, and the chunks of the layouts (see
+# parquet_chunked()) in the same LRU. A floor joined from its chunks
+# isn't kept whole (it would be stored twice), it's joined again from
+# the chunks ; the chunks have their own hits / misses. Both engines
+# give the same floor, so the engine isn't part of the key. When the
+# size of the layouts is over the limit, the least recently used ones
+# are removed. The arrays are read-only : copy them before a change.
+# The height of a board is height * randheight * random value, so the
+# layouts are computed with a unit height (Z = random value) and the
+# height isn't part of the key : a new height only scales the Z column.
+# The windows of the previews (cached=False) are computed for one frame
+# and never kept, nor their chunks.
+
+cache = {"layouts": OrderedDict(), "size": 0, "limit": 256 * 2**20, "hits": 0, "misses": 0, "evictions": 0, "chunk_hits": 0, "chunk_misses": 0}
+cache_lock = threading.RLock()                                            # The background jobs use the cache too
+
+def layout_key(params):
+	"""Normalized parameters : only bool, int, float values and the name of the pattern"""
+	return tuple(v if isinstance(v, (bool, int, str)) else float(v) for v in params)
+
+HEIGHT = 3                                                                # Index of height in the parameters, randheight follows
+
+def unit_params(params):
+	"""Parameters of the layout with a unit height"""
+	return params[:HEIGHT] + (1.0, 1.0) + params[HEIGHT + 2:]
+
+def layout(params, engine="NUMPY", unit=None, cached=True):
+	"""Vertices and sizes of the faces of the floor, computed or from the cache (or from the unit layout 'unit')"""
+	co, sizes = unit if unit is not None else unit_layout(params, engine, cached=cached)
+	co = co.copy()
+	co[:, 2] = heights(co, params)
+	return co, sizes
+
+def heights(co, params):
+	"""Z of the vertices of the unit layout co for the height of params"""
+	return co[:, 2] * (params[HEIGHT + 1] * params[HEIGHT])
+
+def unit_layout(params, engine="NUMPY", cancel=None, cached=True):
+	"""Layout with a unit height, computed or from the cache (not kept if not 'cached')"""
+	params = unit_params(tuple(params))
+	key = layout_key(params)
+	found = cache_get(key) if cached else None
+	if found is not None:
+		return found
+
+	pattern, args = pattern_params(params)
+	tiled = pattern["tiled"](*args) if pattern["tiled"] and engine != "LOOP" else None # Periodic floor : no column to compute
+	if tiled is not None:
+		co, sizes = tiled
+	elif engine == "NUMPY" and pattern["chunked"] and cached:
+		return pattern["chunked"](*args, cancel=cancel)                   # Only the new chunks are computed, the chunks are cached
+	elif engine == "PARALLEL":
+		co, sizes = groups_parallel(pattern["columns"](*args), pattern["column"])
+	elif engine == "LOOP" and pattern["loop"]:
+		co, sizes = pydata_to_array(*pattern["loop"](*args))
+	else:
+		co, sizes = pattern_array(params, cancel)
+	if not cached:                                                        # A preview : computed for one frame
+		return co, sizes
+	return cache_put(key, co, sizes)
+
+def layout_cached(params):
+	"""True if the unit layout of params is in the cache, whole or all its chunks"""
+	params = unit_params(tuple(params))
+	layouts = cache["layouts"]
+	if layout_key(params) in layouts:
+		return True
+	pattern, args = pattern_params(params)
+	if not pattern["chunked"]:
+		return False
+	with cache_lock:
+		return all(key in layouts for group in pattern["columns"](*args) for column in group for r0, r1, key in column_chunks(*column))
+
+def cache_get(key):
+	"""The (vertices, sizes) of the key, or None"""
+	kind = "chunk_" if key[0] == "CHUNK" else ""                          # The chunks counted apart
+	with cache_lock:
+		layouts = cache["layouts"]
+		if key in layouts:
+			cache[kind + "hits"] += 1
+			layouts.move_to_end(key)
+			return layouts[key]
+		cache[kind + "misses"] += 1
+		return None
+
+def cache_put(key, co, sizes):
+	"""Keep the (vertices, sizes) of the key, read-only"""
+	co.flags.writeable = False
+	sizes.flags.writeable = False
+	nbytes = co.nbytes + sizes.nbytes
+	with cache_lock:
+		if nbytes <= cache["limit"]:                                      # A layout bigger than the limit isn't kept
+			old = cache["layouts"].pop(key, None)                         # Put again (two jobs of the same floor)
+			if old is not None:
+				cache["size"] -= old[0].nbytes + old[1].nbytes
+			cache["layouts"][key] = (co, sizes)
+			cache["size"] += nbytes
+			cache_trim()
+	return co, sizes
+
+def cache_trim():
+	"""Remove the least recently used layouts until the size is under the limit"""
+	with cache_lock:
+		layouts = cache["layouts"]
+		while cache["size"] > cache["limit"] and layouts:
+			co, sizes = layouts.popitem(last=False)[1]
+			cache["size"] -= co.nbytes + sizes.nbytes
+			cache["evictions"] += 1
+
+def cache_limit(limit):
+	"""Set the memory limit of the cache (bytes)"""
+	cache["limit"] = limit
+	cache_trim()
+
+def cache_clear():
+	with cache_lock:
+		cache["layouts"].clear()
+		cache["size"] = 0
+
+def cache_stats():
+	"""entries : the whole floors, chunks : the chunks of the floors"""
+	with cache_lock:
+		chunks = sum(1 for key in cache["layouts"] if key[0] == "CHUNK")
+		return {"entries": len(cache["layouts"]) - chunks, "chunks": chunks, "size": cache["size"], "limit": cache["limit"],
+				"hits": cache["hits"], "misses": cache["misses"], "evictions": cache["evictions"],
+				"chunk_hits": cache["chunk_hits"], "chunk_misses": cache["chunk_misses"]}
+
+#############################################################
+# BACKGROUND
+#############################################################
+# The unit layout of a floor computed in a thread, so the UI isn't
+# blocked : the numpy operations release the GIL and the caller polls
+# the results from a timer, the mesh is written on the main thread.
+# Each job has a generation number. A new job for the same object
+# cancels the one in flight (checked between the columns with the NUMPY
+# engine) and only the results of the last generation of an object are
+# given back, a stale layout is never applied.
+
+class JobCancelled(Exception):
+	pass
+
+jobs = {"executor": None, "generation": 0, "running": {}}
+
+def job_submit(name, params, engine="NUMPY"):
+	"""Compute the unit layout of params for the object 'name' in the background, return the generation of the job"""
+	job_cancel(name)
+	if jobs["executor"] is None:
+		jobs["executor"] = ThreadPoolExecutor(max_workers=1)              # One job at a time, a cancelled one ends at the next column
+	jobs["generation"] += 1
+	cancel = threading.Event()
+	future = jobs["executor"].submit(unit_layout, params, engine, cancel.is_set)
+	jobs["running"][name] = {"generation": jobs["generation"], "params": tuple(params), "future": future, "cancel": cancel}
+	return jobs["generation"]
+
+def job_cancel(name):
+	"""Cancel the job of the object 'name', if any"""
+	job = jobs["running"].pop(name, None)
+	if job is not None:
+		job["cancel"].set()
+		job["future"].cancel()
+
+def job_results():
+	"""Yield (name, generation, params, future) of the finished jobs of the last generation"""
+	for name, job in list(jobs["running"].items()):
+		if job["future"].done():
+			del jobs["running"][name]
+			yield name, job["generation"], job["params"], job["future"]
+
+def job_shutdown():
+	for name in list(jobs["running"]):
+		job_cancel(name)
+	if jobs["executor"] is not None:
+		jobs["executor"].shutdown(wait=False)
+		jobs["executor"] = None
+
+#############################################################
+# COLORS
+#############################################################
+# One color and one vertex group per board (face), for all the boards
+# at once. The random values are keyed on the color seed and the index
+# of the board, the rows of the keys are 0.
+# - no color : a random color per board, no group
+# - colrand : a palette of 'colrand' colors, a random one per board
+#   (allrandom : a random color per board and a random group)
+# - colphase : a palette of 'colphase' colors, taken in turn
+
+def board_colors(nbr, colseed, colrand, colphase, allrandom):
+	"""RGBA colors (nbr, 4) and vertex group of each board"""
+	boards = np.arange(nbr)
+	channels = np.arange(3)
+	if colrand == 0 and colphase == 0:
+		rgb = randarray(colseed, boards[:, None], 0, RAND_COLOR, channels)
+		groups = np.zeros(nbr, dtype=np.int32)
+	elif colrand > 0:
+		groups = (randarray(colseed, boards, 0, RAND_GROUP) * colrand).astype(np.int32)
+		if allrandom:
+			rgb = np.round(randarray(colseed, boards[:, None], 0, RAND_COLOR, channels), 1)
+		else:
+			palette = np.round(randarray(colseed, np.arange(colrand)[:, None], 0, RAND_PALETTE, channels), 1)
+			rgb = palette[groups]
+	else:
+		palette = np.round(randarray(colseed, np.arange(colphase)[:, None], 0, RAND_PALETTE, channels), 1)
+		groups = (colphase - 1 - boards % colphase).astype(np.int32)      # The last color first, like before
+		rgb = palette[groups]
+
+	colors = np.ones((nbr, 4), dtype=np.float32)
+	colors[:, :3] = rgb.reshape(nbr, 3)
+	return colors, groups
+
+def board_random(nbr, colseed):
+	"""A random value in [0, 1) for each board"""
+	return randarray(colseed, np.arange(nbr), 0, RAND_BOARD).astype(np.float32)
+
+#############################################################
+# UV
+#############################################################
+# UV of each loop in the frame of its board : V along the longest edge
+# of the board (the grain of the wood), U across it, so the tilted and
+# the herringbone boards get their texture along their length too. A
+# board may have several faces (the solids, the pieces of a board cut by
+# the outline, 'boards' gives the board of each face) : the frame is the
+# one of its top face (the biggest one seen from above), and the corners
+# minus the smallest U / V of the board, so all the faces of a board
+# share its part of the texture, starting at the origin (1 unit = 1
+# meter). The faces are projected like a box in the frame of the board :
+# the top and the bottom on U / V, the long sides on Z / V, the ends on
+# U / Z. 'offset' adds a random offset in [0, offset) to each board,
+# keyed on the color seed and the board, so the boards don't all use the
+# same part of the texture.
+
+def next_loops(loop_starts, nloops):
+	"""Next loop of the same face, for each loop"""
+	following = np.arange(1, nloops + 1)
+	following[np.append(loop_starts[1:], nloops) - 1] = loop_starts
+	return following
+
+def board_axes(loop_co, loop_starts):
+	"""U and V axes (faces, 2) of each face : V along its longest edge, towards +Y"""
+	loop_faces = np.repeat(np.arange(len(loop_starts)), np.diff(np.append(loop_starts, len(loop_co))))
+	ends = np.append(loop_starts[1:], len(loop_co)) - 1
+	edge = loop_co[next_loops(loop_starts, len(loop_co))] - loop_co
+	length = np.hypot(edge[:, 0], edge[:, 1])
+	longest = np.lexsort((length, loop_faces))[ends]                      # Sorted by face then length : the last one of each face
+	v = edge[longest]
+	v = v / np.maximum(np.hypot(v[:, 0], v[:, 1]), 1e-12)[:, None]
+	flip = (v[:, 1] < 0) | ((v[:, 1] == 0) & (v[:, 0] < 0))
+	v[flip] = -v[flip]
+	u = np.stack((v[:, 1], -v[:, 0]), axis=1)                             # V = +Y gives U = +X
+	return u, v, loop_faces
+
+def face_normals(loop_co, loop_starts):
+	"""Normal (faces, 3) of each face (Newell), its length is twice the area of the face"""
+	a = loop_co
+	b = loop_co[next_loops(loop_starts, len(loop_co))]
+	terms = np.stack(((a[:, 1] - b[:, 1]) * (a[:, 2] + b[:, 2]),
+					  (a[:, 2] - b[:, 2]) * (a[:, 0] + b[:, 0]),
+					  (a[:, 0] - b[:, 0]) * (a[:, 1] + b[:, 1])), axis=1)
+	return np.add.reduceat(terms, loop_starts, axis=0)
+
+def board_uvs(loop_co, loop_starts, colseed, offset, boards=None):
+	"""UV (loops, 2) from the coordinates (loops, 3) of the loops, the first loop and the board of each face"""
+	if not len(loop_starts):
+		return np.zeros((0, 2), dtype=np.float32)
+	co = np.asarray(loop_co, dtype=np.float64)
+	if boards is None:                                                    # One face per board
+		boards = np.arange(len(loop_starts))
+	ids, board = np.unique(boards, return_inverse=True)                   # Index of the board of each face
+	u, v, loop_faces = board_axes(co[:, :2], loop_starts)
+	normals = face_normals(co, loop_starts)
+	top = np.lexsort((np.abs(normals[:, 2]), board))[np.cumsum(np.bincount(board)) - 1] # Sorted by board then area from above : the last one of each board
+	u = u[top][board]                                                     # Frame of the board of each face
+	v = v[top][board]
+	across = np.abs((normals[:, :2] * u).sum(axis=1))
+	along = np.abs((normals[:, :2] * v).sum(axis=1))
+	flat = np.abs(normals[:, 2]) >= np.maximum(across, along)             # Top and bottom
+	side = ~flat & (across >= along)                                      # Long sides, else the ends
+
+	loop_board = board[loop_faces]
+	coords = np.stack(((co[:, :2] * u[loop_faces]).sum(axis=1), (co[:, :2] * v[loop_faces]).sum(axis=1), co[:, 2]), axis=1)
+	order = np.argsort(loop_board, kind="stable")
+	origin = np.minimum.reduceat(coords[order], np.searchsorted(loop_board[order], np.arange(len(ids))), axis=0) # Smallest U / V / Z of each board
+	if offset > 0:
+		origin[:, :2] -= offset * randarray(colseed, ids[:, None], 0, RAND_UV, np.arange(2))
+	coords -= origin[loop_board]
+	uv = coords[:, :2].copy()
+	uv[side[loop_faces], 0] = coords[side[loop_faces], 2]
+	ends = ~flat & ~side
+	uv[ends[loop_faces], 1] = coords[ends[loop_faces], 2]
+	return uv.astype(np.float32)
+
+#############################################################
+# OUTLINE
+#############################################################
+# The floor cut by the outline of the room : a closed polygon (P, 2) in
+# the XY plane of the floor. A uniform grid covers the outline, a cell is
+# on the boundary (an edge of the outline goes through it or next to
+# it), inside or outside. With summed-area tables, the cells under the
+# bounding box of each board give, for all the boards at once :
+# - no boundary cell, some inside cells : the board is kept as it is
+# - no boundary cell, no inside cell : the board is dropped
+# - else the edges of the board are tested against the edges of the
+#   outline, and only the boards crossing it are cut : the parts of the
+#   outline in the board (convex) are joined by the boundary of the
+#   board (Weiler-Atherton), so a board cut in several pieces gives
+#   several faces.
+# The cut faces keep the Z of their board and the order of the faces,
+# 'boards' gives the board of each face.
+
+def inside_polygon(px, py, outline):
+	"""Even-odd rule, for all the points (px, py) at once"""
+	inside = np.zeros(np.broadcast(px, py).shape, dtype=bool)
+	x0, y0 = outline[:, 0], outline[:, 1]
+	x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+	for i in range(len(outline)):
+		if y0[i] == y1[i]:                                                # Horizontal edge : never crossed
+			continue
+		cross = (y0[i] > py) != (y1[i] > py)
+		inside ^= cross & (px < (x1[i] - x0[i]) * (py - y0[i]) / (y1[i] - y0[i]) + x0[i])
+	return inside
+
+def outline_grid(outline, cell):
+	"""Origin, size of the cells, summed-area tables of the boundary cells and of the inside cells"""
+	origin = outline.min(axis=0)
+	shape = np.maximum(np.ceil((outline.max(axis=0) - origin) / cell).astype(int), 1)
+	boundary = np.zeros(shape, dtype=bool)
+	a = outline
+	b = np.roll(outline, -1, axis=0)
+	for p, q in zip(a, b):                                                # Cells along each edge, every half cell
+		steps = int(np.ceil(np.linalg.norm(q - p) / (cell / 2))) + 1
+		t = np.linspace(0.0, 1.0, steps)[:, None]
+		ij = np.floor((p + (q - p) * t - origin) / cell).astype(int)
+		for di in (-1, 0, 1):                                             # And their neighbors : the rounding
+			for dj in (-1, 0, 1):
+				i = np.clip(ij[:, 0] + di, 0, shape[0] - 1)
+				j = np.clip(ij[:, 1] + dj, 0, shape[1] - 1)
+				boundary[i, j] = True
+	centers = [origin[k] + (np.arange(shape[k]) + 0.5) * cell for k in (0, 1)]
+	inside = inside_polygon(centers[0][:, None], centers[1][None, :], outline) & ~boundary
+	tables = []
+	for cells in (boundary, inside):
+		table = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int64)
+		table[1:, 1:] = cells.cumsum(axis=0).cumsum(axis=1)
+		tables.append(table)
+	return origin, cell, tables
+
+def grid_cells(table, i0, i1):
+	"""Number of cells in the boxes of cells i0 to i1 (excluded), from the summed-area table"""
+	return table[i1[:, 0], i1[:, 1]] - table[i0[:, 0], i1[:, 1]] - table[i1[:, 0], i0[:, 1]] + table[i0[:, 0], i0[:, 1]]
+
+def boards_cross(boards, outline):
+	"""For each board (B, n, 2) : True if its edges touch the outline, or if it holds the first point of the outline"""
+	cross = np.zeros(len(boards), dtype=bool)
+	c = outline[None, None]
+	d = np.roll(outline, -1, axis=0)[None, None]
+	step = max(1, 2**22 // (boards.shape[1] * len(outline)))              # Boards x edges x outline edges per chunk
+	for i in range(0, len(boards), step):
+		a = boards[i:i + step, :, None]
+		b = np.roll(boards[i:i + step], -1, axis=1)[:, :, None]
+		o1 = (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+		o2 = (b[..., 0] - a[..., 0]) * (d[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (d[..., 0] - a[..., 0])
+		o3 = (d[..., 0] - c[..., 0]) * (a[..., 1] - c[..., 1]) - (d[..., 1] - c[..., 1]) * (a[..., 0] - c[..., 0])
+		o4 = (d[..., 0] - c[..., 0]) * (b[..., 1] - c[..., 1]) - (d[..., 1] - c[..., 1]) * (b[..., 0] - c[..., 0])
+		cross[i:i + step] = np.any((o1 * o2 <= 0) & (o3 * o4 <= 0), axis=(1, 2))
+	edge = np.roll(boards, -1, axis=1) - boards                           # The whole outline in a (convex) board
+	side = edge[..., 0] * (outline[0, 1] - boards[..., 1]) - edge[..., 1] * (outline[0, 0] - boards[..., 0])
+	return cross | np.all(side >= 0, axis=1) | np.all(side <= 0, axis=1)
+
+def boundary_param(points, board):
+	"""Place of the points on the boundary of the board : index of the edge + fraction of the edge"""
+	edge = np.roll(board, -1, axis=0) - board
+	rel = points[:, None] - board[None]                                   # (points, edges, 2)
+	t = np.clip((rel * edge).sum(axis=2) / np.maximum((edge * edge).sum(axis=1), 1e-30), 0, 1)
+	distance = ((rel - t[..., None] * edge) ** 2).sum(axis=2)
+	k = distance.argmin(axis=1)
+	return (k + t[np.arange(len(points)), k]) % len(board)
+
+def clip_polygon(outline, board):
+	"""Parts of the outline inside the convex board (both counterclockwise), a list of (n, 2) points"""
+	p = outline
+	q = np.roll(outline, -1, axis=0)
+
+	#------------------------------------------------------------
+	# Part [t0, t1] of each edge of the outline in the board (Cyrus-Beck)
+	#------------------------------------------------------------
+	t0 = np.zeros(len(p))
+	t1 = np.ones(len(p))
+	for a, b in zip(board, np.roll(board, -1, axis=0)):
+		dp = (b[0] - a[0]) * (p[:, 1] - a[1]) - (b[1] - a[1]) * (p[:, 0] - a[0]) # > 0 : left of a -> b, inside
+		dq = (b[0] - a[0]) * (q[:, 1] - a[1]) - (b[1] - a[1]) * (q[:, 0] - a[0])
+		tolerance = 1e-9 * np.hypot(b[0] - a[0], b[1] - a[1])             # On the side of the board
+		dp[np.abs(dp) <= tolerance] = 0
+		dq[np.abs(dq) <= tolerance] = 0
+		t1[(dp < 0) & (dq < 0)] = -1.0                                    # Out of this side of the board
+		along = (dp == 0) & (dq == 0)                                     # On the side, backwards : the outline is out of the board there
+		t1[along & ((q[:, 0] - p[:, 0]) * (b[0] - a[0]) + (q[:, 1] - p[:, 1]) * (b[1] - a[1]) < 0)] = -1.0
+		change = (dp < 0) != (dq < 0)
+		t = np.divide(dp, dp - dq, out=np.zeros_like(dp), where=change)
+		t0 = np.where(change & (dp < 0), np.maximum(t0, t), t0)           # Comes in
+		t1 = np.where(change & (dq < 0), np.minimum(t1, t), t1)           # Goes out
+	inside = t0 < t1
+	if not inside.any():                                                  # No edge in the board : the board is in or out of the outline
+		center = board.mean(axis=0)
+		return [board] if inside_polygon(center[0], center[1], outline) else []
+	if inside.all() and not t0.any() and (t1 == 1).all():                 # The whole outline in the board
+		return [outline]
+
+	#------------------------------------------------------------
+	# Runs of the outline in the board, from a point on the boundary to another one
+	#------------------------------------------------------------
+	begin = np.flatnonzero(~inside | (t0 > 0))
+	first = begin[0] if len(begin) else 0                                 # An edge out of the board, or coming in
+	runs = []
+	run = None
+	for i in np.roll(np.arange(len(p)), -first):
+		if not inside[i]:
+			if run is not None:
+				runs.append(run)
+				run = None
+			continue
+		if run is None or t0[i] > 0:
+			if run is not None:
+				runs.append(run)
+			run = [p[i] + t0[i] * (q[i] - p[i])]
+		run.append(p[i] + t1[i] * (q[i] - p[i]))
+		if t1[i] < 1:
+			runs.append(run)
+			run = None
+	if run is not None:
+		runs.append(run)
+
+	#------------------------------------------------------------
+	# Pieces : a run, then the boundary of the board (counterclockwise) to the next run
+	#------------------------------------------------------------
+	size = len(board)
+	entries = boundary_param(np.array([run[0] for run in runs]), board)
+	exits = boundary_param(np.array([run[-1] for run in runs]), board)
+	used = np.zeros(len(runs), dtype=bool)
+	pieces = []
+	for r in range(len(runs)):
+		if used[r]:
+			continue
+		piece = []
+		k = r
+		while not used[k]:
+			used[k] = True
+			piece.extend(runs[k])
+			gap = (entries - exits[k]) % size
+			following = int(gap.argmin())
+			corners = (np.arange(size) - exits[k]) % size                 # Corners of the board passed on the way
+			between = np.flatnonzero((corners > 0) & (corners < gap[following]))
+			piece.extend(board[between[np.argsort(corners[between])]])
+			k = following
+		piece = np.array(piece)
+		piece = piece[np.any(np.abs(piece - piece[np.arange(-1, len(piece) - 1)]) > 1e-9, axis=1)] # Points met twice
+		if len(piece) >= 3:
+			pieces.append(piece)
+	return pieces
+
+def polygon_area(pts):
+	"""Signed area, > 0 if counterclockwise"""
+	x, y = pts[..., 0], pts[..., 1]
+	return (x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y).sum(axis=-1) / 2
+
+def clip_layout(co, sizes, outline, cell=None):
+	"""Vertices, sizes and board of each face of the floor cut by the outline"""
+	outline = np.asarray(outline, dtype=np.float64)[:, :2]
+	if polygon_area(outline) < 0:
+		outline = outline[::-1]
+	nfaces = len(sizes)
+	starts = np.cumsum(sizes) - sizes
+	if nfaces == 0 or len(outline) < 3:
+		return co[:0], sizes[:0], np.zeros(0, dtype=np.int64)
+	xy = co[:, :2].astype(np.float64)
+	low = np.minimum.reduceat(xy, starts)                                 # Bounding box of each face
+	high = np.maximum.reduceat(xy, starts)
+	if cell is None:                                                      # About the size of a board, no more than 4M cells
+		extent = outline.max(axis=0) - outline.min(axis=0)
+		cell = max(float(np.median(np.min(high - low, axis=1))), float(extent.max()) / 2048, 1e-6)
+	origin, cell, (boundary, inside) = outline_grid(outline, cell)
+	shape = np.array(boundary.shape) - 1
+
+	#------------------------------------------------------------
+	# Boards kept, dropped or cut
+	#------------------------------------------------------------
+	i0 = np.clip(np.floor((low - origin) / cell).astype(np.int64), 0, shape - 1)
+	i1 = np.clip(np.floor((high - origin) / cell).astype(np.int64), 0, shape - 1) + 1
+	overlap = np.all(high >= outline.min(axis=0), axis=1) & np.all(low <= outline.max(axis=0), axis=1)
+	cut = overlap & (grid_cells(boundary, i0, i1) > 0)
+	keep = overlap & ~cut & (grid_cells(inside, i0, i1) > 0)
+	for n in np.unique(sizes[cut]):                                       # Near the boundary : only the boards crossing it are cut
+		faces = np.flatnonzero(cut & (sizes == n))
+		boards = xy[starts[faces][:, None] + np.arange(n)]
+		whole = faces[~boards_cross(boards, outline)]
+		cut[whole] = False
+		keep[whole] = inside_polygon(xy[starts[whole], 0], xy[starts[whole], 1], outline)
+
+	#------------------------------------------------------------
+	# Exact cut of the boards on the boundary
+	#------------------------------------------------------------
+	pieces = {}
+	for face in np.flatnonzero(cut):
+		board = xy[starts[face]:starts[face] + sizes[face]]
+		clockwise = polygon_area(board) < 0
+		found = [piece[::-1] if clockwise else piece                      # Same direction as the board
+				 for piece in clip_polygon(outline, board[::-1] if clockwise else board)
+				 if abs(polygon_area(piece)) > 1e-12]
+		if found:
+			pieces[face] = found
+
+	#------------------------------------------------------------
+	# Faces in the order of the boards : the kept ones, the pieces of the cut ones
+	#------------------------------------------------------------
+	count = keep.astype(np.int64)                                         # Faces of each board
+	for face, found in pieces.items():
+		count[face] = len(found)
+	boards = np.repeat(np.arange(nfaces), count)
+	first = np.cumsum(count) - count                                      # First face of each board
+	new_sizes = np.repeat(sizes, count)
+	for face, found in pieces.items():
+		new_sizes[first[face]:first[face] + len(found)] = [len(piece) for piece in found]
+	new_starts = np.cumsum(new_sizes) - new_sizes
+	new_co = np.empty((int(new_sizes.sum()), 3), dtype=co.dtype)
+	vface = np.repeat(np.arange(nfaces), sizes)                           # Face of each vertex
+	kept = keep[vface]
+	new_co[new_starts[first[vface[kept]]] + (np.arange(len(co))[kept] - starts[vface[kept]])] = co[kept]
+	for face, found in pieces.items():
+		for i, piece in enumerate(found):
+			start = new_starts[first[face] + i]
+			new_co[start:start + len(piece), :2] = piece
+			new_co[start:start + len(piece), 2] = co[starts[face], 2]
+	return new_co, new_sizes.astype(sizes.dtype), boards
+
+#############################################################
+# SOLIDS
+#############################################################
+# The boards as closed solids, instead of the Solidify and Bevel
+# modifiers : the face of the board is the bottom, the top is
+# 'thickness' above it. With a chamfer the top is inset by 'chamfer'
+# and a ring of chamfer faces joins it to the sides, 'chamfer' below
+# the top. The boards of the same number of vertices are computed
+# together. The vertices are shared by the faces of a board, so the
+# loops have their own vertex index (loop_verts).
+# The chamfer of a board is clamped a bit under its thickness and half
+# its width (the distance from its center to its closest side) : the
+# top can't go below the bottom nor the inset cross itself.
+#          inset (top)
+#        *-----------*
+#       /             \   chamfer
+#      *---------------*  mid = top - chamfer
+#      |               |  sides
+#      *---------------*  ring = face of the board (bottom)
+
+def inset_ring(ring, chamfer):
+	"""Vertices of the rings (B, n, 3), counterclockwise, moved 'chamfer' inside"""
+	edge = np.roll(ring[..., :2], -1, axis=1) - ring[..., :2]             # Edge k : vertex k -> k + 1
+	length = np.linalg.norm(edge, axis=2, keepdims=True)
+	edge = np.divide(edge, length, out=np.zeros_like(edge), where=length > 0)
+	inward = np.stack((-edge[..., 1], edge[..., 0]), axis=2)              # Left of the edges : inside
+	before = np.roll(inward, 1, axis=1)                                   # Edge k - 1
+	cos = np.maximum(1 + (inward * before).sum(axis=2, keepdims=True), 0.1) # Spikes : no more than 10 x chamfer
+	inset = ring.copy()
+	inset[..., :2] += chamfer * (inward + before) / cos
+	return inset
+
+chamfer_epsilon = 1e-6                                                    # Kept under the limits of the chamfer
+
+def board_chamfer(ring, thickness, chamfer):
+	"""Chamfer of each board of the rings (B, n, 3), as (B, 1)"""
+	center = ring[..., :2].mean(axis=1, keepdims=True)
+	edge = np.roll(ring[..., :2], -1, axis=1) - ring[..., :2]
+	length = np.linalg.norm(edge, axis=2)
+	cross = np.abs(edge[..., 0] * (center[..., 1] - ring[..., 1]) - edge[..., 1] * (center[..., 0] - ring[..., 0]))
+	half = np.divide(cross, length, out=np.full_like(length, np.inf), where=length > 0).min(axis=1) # Center to the closest side
+	return np.maximum(np.minimum(chamfer, np.minimum(thickness, half) - chamfer_epsilon), 0)[:, None]
+
+def board_solids(co, sizes, thickness, chamfer):
+	"""Vertices (V, 3), loop vertices, loop totals and board of each face of the solids"""
+	starts = np.cumsum(sizes) - sizes
+	cos = []
+	loop_verts = []
+	loop_totals = []
+	face_boards = []
+	nverts = 0
+	for n in np.unique(sizes):
+		board = np.flatnonzero(sizes == n)
+		ring = co[starts[board][:, None] + np.arange(n)].astype(np.float64) # (B, n, 3)
+		x = ring[..., 0]
+		y = ring[..., 1]
+		area = (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+		ring[area < 0] = ring[area < 0, ::-1]                             # Counterclockwise from above
+		top = ring.copy()
+		top[..., 2] += thickness
+		if chamfer > 0:
+			clamped = board_chamfer(ring, thickness, chamfer)
+			mid = top.copy()
+			mid[..., 2] -= clamped
+			layers = [ring, mid, inset_ring(top, clamped[..., None])]
+		else:
+			layers = [ring, top]
+		nl = len(layers)
+		cos.append(np.stack(layers, axis=1).reshape(-1, 3))               # Board after board, layer after layer
+
+		# Faces of a board : bottom, top, then a quad for each edge of each layer
+		k = np.arange(n)
+		k1 = (k + 1) % n
+		faces = [k[::-1], (nl - 1) * n + k]                               # Bottom looks down, top looks up
+		for layer in range(nl - 1):
+			a = layer * n
+			faces.extend(np.stack((a + k, a + k1, a + n + k1, a + n + k), axis=1))
+		local = np.concatenate(faces)                                     # Loops of 1 board
+		first = nverts + np.arange(len(board)) * nl * n                   # First vertex of each board
+		loop_verts.append((first[:, None] + local).ravel())
+		totals = np.array([n, n] + [4] * ((nl - 1) * n), dtype=np.int32)
+		loop_totals.append(np.tile(totals, len(board)))
+		face_boards.append(np.repeat(board, len(totals)))
+		nverts += len(board) * nl * n
+
+	if not cos:
+		return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+	return (np.concatenate(cos).astype(np.float32), np.concatenate(loop_verts).astype(np.int32),
+			np.concatenate(loop_totals), np.concatenate(face_boards))
+
+#############################################################
+# MESH
+#############################################################
+# Flat buffers of the mesh : float32 coordinates (V * 3), and int32
+# vertex index of each loop, first loop and number of loops of each face.
+# The vertices of a face follow each other, so loop i uses vertex i,
+# unless the faces share their vertices (loop_verts of the solids).
+
+def mesh_buffers(co, sizes, loop_verts=None):
+	loop_totals = np.ascontiguousarray(sizes, dtype=np.int32)
+	loop_starts = np.zeros(len(loop_totals), dtype=np.int32)
+	np.cumsum(loop_totals[:-1], out=loop_starts[1:])
+	if loop_verts is None:                                                # The vertices of a face follow each other
+		loop_verts = np.arange(len(co), dtype=np.int32)
+	return np.ascontiguousarray(co, dtype=np.float32).ravel(), loop_verts, loop_starts, loop_totals
+
+#############################################################
+# PROFILE
+#############################################################
+# Each regeneration of a floor is a run : the time of each stage
+# (layout, mesh, colors...), the number of boards / vertices / faces and,
+# if 'tracemalloc' is on, the peak of the memory allocated during the
+# run. The last runs are kept in profile["runs"] and each finished run
+# is passed to the functions of profile["callbacks"] (batch jobs, logs).
+# A run is a plain dict, so it can be dumped to JSON as it is.
+# The tracing of tracemalloc is only stopped (or its traces cleared) if
+# it was started here ("traced") : another tool may be tracing too.
+
+profile = {"run": None, "runs": deque(maxlen=100), "callbacks": [], "tracemalloc": False, "traced": False}
+
+def profile_start(name, kind):
+	"""Start the run of the object 'name', kind = GEOMETRY / HEIGHT / COLOR / PREVIEW"""
+	if profile["tracemalloc"]:
+		if not tracemalloc.is_tracing():
+			tracemalloc.start()
+			profile["traced"] = True
+		elif hasattr(tracemalloc, "reset_peak"):                          # Python >= 3.9
+			tracemalloc.reset_peak()
+		elif profile["traced"]:
+			tracemalloc.clear_traces()
+	elif profile["traced"]:
+		profile["traced"] = False
+		if tracemalloc.is_tracing():
+			tracemalloc.stop()
+	profile["run"] = {"object": name, "kind": kind, "time": time.time(), "stages": OrderedDict(),
+					  "total": 0.0, "boards": 0, "vertices": 0, "faces": 0, "peak": None, "warning": None, "start": time.perf_counter()}
+
+def profile_warning(text):
+	"""Warning of the current run (shown in the panel)"""
+	if profile["run"] is not None:
+		profile["run"]["warning"] = text
+
+@contextmanager
+def stage(name):
+	"""Time of the block, added to the stage 'name' of the current run"""
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		run = profile["run"]
+		if run is not None:
+			run["stages"][name] = run["stages"].get(name, 0.0) + time.perf_counter() - start
+
+def profile_end(boards, vertices, faces):
+	"""Finish the current run and pass it to the callbacks"""
+	run = profile["run"]
+	if run is None:
+		return None
+	profile["run"] = None
+	run["total"] = time.perf_counter() - run.pop("start")
+	run["boards"], run["vertices"], run["faces"] = boards, vertices, faces
+	if profile["tracemalloc"] and tracemalloc.is_tracing():
+		run["peak"] = tracemalloc.get_traced_memory()[1]
+	profile["runs"].append(run)
+	for callback in profile["callbacks"]:
+		callback(run)
+	return run
+
+def profile_last(name=None):
+	"""Last run, of the object 'name' if given"""
+	for run in reversed(profile["runs"]):
+		if name is None or run["object"] == name:
+			return run
+	return None
@@ -18,199 +18,14 @@
 # ***** END GPL LICENCE BLOCK *****
 
 import math
+import time
+from contextlib import contextmanager
+import numpy as np
 import bpy
 import bmesh
-from bpy.props import IntProperty, FloatProperty, BoolProperty, FloatVectorProperty, EnumProperty
-from mathutils import Vector, Euler, Matrix
-from random import random as rand, seed, uniform as randuni, randint
-
-#############################################################
-# COMPUTE THE LENGTH OF THE BOARD AFTER THE TILT
-#############################################################
-# The 'Tilt' is not a rotation.
-# It's a translation of the two first vertex on X axis (translatex)
-# and a translation of the two ending vertex on the Y axis (translatey)
-# This will distord the board. So, to keep the end shape and the length
-# I compute the end shape's opposite (1) then the hypotenuse (3)
-# using the width (2) and the angle (offsetx) from the Pythagoras Theorem (yeaah trigonometry !)
-# Then, I compute the new length of the board (translatex)
-#     1
-#   *---*-----------------------           |   *----*
-#   |  /                                   |    \    \
-# 2 | / 3                                  V     \    \
-#   |/                                 translatey \    \
-#   *---------------------------                   *----*  ---> translatex
-
-def calculangle(tilt, width, lengthboard):
-
-	opposite = width * math.tan(tilt)
-	hyp = math.sqrt(width ** 2 + opposite ** 2)
-	translatex = lengthboard * math.sin(tilt)
-	translatey = math.sqrt((lengthboard ** 2) - (translatex ** 2))
-
-	return (hyp, translatex, translatey)
-
-#############################################################
-# BOARD
-#############################################################
-# Mesh of the board.
-# If the boards are tilt, we need to inverse the angle each time we call this function :
-# /\/\/ -> So each board will be upside-down compared to each other
-def board(start, left, right, end, tilt, translatex, hyp, herringbone, gapy, height, randheight):
-
-	gapx = 0
-	height = randheight * randuni(0, height)                              # Add randomness to the height of the boards
-	if not herringbone: gapy = 0
-
-	if tilt > 0:                                                          # / / / -> 1 board, 3 board, 5 board...
-		shiftdown = translatex
-		shiftup = 0
-		if herringbone:
-			gapy = gapy / 2
-			gapx = 0
-
-	else:                                                                 #  \ \ \-> 2 board, 4 board, 6 board...
-		shiftdown = 0
-		shiftup = -translatex
-		if herringbone:
-			gapy = gapy / 2
-			gapx = gapy * 2
-
-	dl = Vector((left + shiftdown + gapx, start - gapy, height))          # down left [0,0,0]
-	dr = Vector((right + shiftdown + gapx, start - gapy, height))         # down right [1,0,0]
-	ur = Vector((right - shiftup + gapx, end - gapy, height))             # up right [1,1,0]
-	ul = Vector((left - shiftup + gapx, end - gapy, height))              # up left [0,1,0]
-
-	if herringbone:
-		if tilt > 0:                                                      # / / / -> 1 board, 3 board, 5 board...
-			ur[0] = ur[0] - (hyp / 2)
-			ur[1] = ur[1] + (hyp / 2)
-			dr[0] = dr[0] - (hyp / 2)
-			dr[1] = dr[1] + (hyp / 2)
-		else:                                                             #  \ \ \-> 2 board, 4 board, 6 board...
-			dl[0] = dl[0] + (hyp / 2)
-			dl[1] = dl[1] + (hyp / 2)
-			ul[0] = ul[0] + (hyp / 2)
-			ul[1] = ul[1] + (hyp / 2)
-
-	verts = (dl, ul, ur, dr)
-
-	return (verts)
-
-#############################################################
-# TRANSVERSAL
-#############################################################
-# Creation of the boards in the interval.
-# --    -> tilt > 0 : No translation on the x axis
-# \\
-#  --   -> tilt < 0 : Translation on the x axis to follow the tilted boards
-# //
-
-def transversal(left, right, start, tilt, translatex, gapy, gapx, gaptrans, randgaptrans, end, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty):
-	gaptrans = gaptrans + (randgaptrans * randuni(0, gaptrans))           # Add randomness to the gap of the transversal of the boards
-	if borders: nbrtrans = 1                                              # Constrain the transversal to 1 board if borders activate
-	if gaptrans < (end-start)/(nbrtrans+1):                               # The gap can't be > to the width of the interval
-		x = 0
-		lengthint = 0
-		if tilt > 0: translatex = 0                                       # Constrain the board to 0 on the x axis
-		width = ((end - start) - (gaptrans * (nbrtrans + 1))) * (1 / nbrtrans)# Width of 1 board in the interval
-		startint = start + gaptrans                                       # Find the start of the first board
-		while right > lengthint:                                          # While the transversal is < to the right edge of the floor (if unlock) or the board (if locked)
-			if locktrans:                                                 # If the length of the transversal is unlock
-				lengthint += lengthtrans                                  # Add the length
-
-			if not locktrans or (lengthint > right): lengthint = right    # Constrain the length of the transversal to th length of the board (locked)
-
-			while x < nbrtrans:                                           # Nbr of boards in the transversal
-				x += 1
-				endtrans = startint + width                               # Find the end of the board
-
-				# Create the boards in the interval
-				nbvert = len(verts)
-				verts.extend(interval(left, lengthint, startint, translatex, gapy, endtrans, height, randheight, width, gapx, gaptrans, borders, endfloor, tilt, shifty))
-				if shifty == 0 and borders and tilt == 0:
-					faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
-				else :
-					faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3))
-				startint = endtrans + gaptrans                            # Find the start of the next board
-
-			#------------------------------------------------------------
-			# Increment / initialize
-			#------------------------------------------------------------
-			if locktrans:
-				left = lengthint + gaptrans
-				lengthint += gaptrans
-				x = 0
-				endtrans = start + width
-				startint = start + gaptrans
-
-			# The boards can't be > to the length of the floor
-			if left > right:
-				lengthint = left
-
-
-#############################################################
-# INTERVAL
-#############################################################
-# Creation of 1 transversal
-
-def interval(left, right, start, translatex, gapy, end, height, randheight, width, gapx, gaptrans, borders, endfloor, tilt, shifty):
-	height = randheight * randuni(0, height)                              # Add randomness to the height of the boards
-	if gaptrans == gapx: bgap = 0
-	else: bgap = gaptrans
-	if shifty == 0 and borders and tilt == 0:
-		tipleft = left-gapx/2+bgap
-		tipright = right+gapx/2-bgap
-		if tipleft < 0: tipleft = 0                                       # Constrain the first left tip to 0...
-		elif tipleft > left: tipleft = left                               # ...and the other to the left of the board
-		if tipright < right: tipright = right                             # Constrain the right tips to the right of the board..
-		if endfloor > 0 : tipright = endfloor                             # ...and the last one to the last board of the floor
-		dr = Vector((right, start, height))                               # Down right
-		dl = Vector((left, start, height))                                # Down left
-		tl = Vector((tipleft, start+(width/2), height))                   # Tip left
-		ul = Vector((left, end, height))                                  # Up left
-		ur = Vector((right, end, height))                                 # Up right
-		tr = Vector((tipright, start+(width/2), height))                  # Tip right
-
-		verts = (dr, dl, tl, ul, ur, tr)
-
-	else:
-		dr = Vector((right + translatex, start, height))                  # Down right
-		dl = Vector((left + translatex, start, height))                   # Down left
-		ul = Vector((left + translatex, end, height))                     # Up left
-		ur = Vector((right + translatex, end, height))                    # Up right
-
-		verts = (dl, ul, ur, dr)
-
-	return verts
-
-#############################################################
-# BORDERS
-#############################################################
-# Creation of the borders
-
-def border(left, right, start, gapy, end, height, randheight, gaptrans, randgaptrans, floor_length, translatey):
-	height = randheight * randuni(0, height)                              # Add randomness to the height of the boards
-	gaptrans = gaptrans + (randgaptrans * randuni(0, gaptrans))
-	tdogapy = gapy
-	tupgapy = gapy
-	if end+tupgapy > floor_length:
-		tupgapy = (floor_length - end)
-	tipdown = start-tdogapy/2+gaptrans
-	tipup = end+tupgapy/2-gaptrans
-	if tipup < end: tipup = end
-	if tipdown < 0 : tipdown = 0
-	elif tipdown > start: tipdown = start
-	td = Vector(((left + right) /2, tipdown, height))                     # Tip down
-	tdl = Vector((left, start, height))                                   # Tip down left
-	tup = Vector((left, end, height))                                     # Tip up left
-	tu = Vector(((left + right) /2, tipup, height))                       # Tip up
-	tur = Vector((right, end, height))                                    # Tip up right
-	tdr = Vector((right, start, height))                                  # Tip down right
-
-	verts = (td, tdl, tup, tu, tur, tdr)
-
-	return verts
+from bpy.props import IntProperty, FloatProperty, BoolProperty, EnumProperty, PointerProperty
+from .core import calculangle, layout, unit_layout, heights, board_colors, board_random, board_uvs, mesh_buffers, cache_limit, cache_clear, cache_stats, pool, pool_shutdown, profile, profile_start, profile_end, profile_last, profile_warning, stage, budget, over_budget, pattern_count, patterns, proxy_layout, board_solids, unit_params, layout_cached, jobs, job_submit, job_cancel, job_results, job_shutdown, preview_params, clip_layout, DEFAULT_PATTERN
+from bpy.app.handlers import persistent
 
 # -------------------------------------------------------------------- #
 def get_lock_length(self):
@@ -245,437 +60,124 @@ def set_nbr_length(self, value):
 
 
 # -------------------------------------------------------------------- #
+# The checkbox only shows floor_type : the herringbone of the floor is
+# the Herringbone pattern, the length is always counted in boards (see
+# parquet_columns()), lock_length is left as it is.
+# The old checkbox kept its own ID property : migrate_herringbone() moves
+# it into floor_type when a file is opened, when the add-on is enabled
+# and before a rebuild (an object appended from an old file).
 def get_herringbone(self):
-	plancher = bpy.data.objects[self.id_data.name]
-	try:
-		return self["herringbone"]
-	except KeyError:
-		return False
+	return self.floor_type == "Herringbone" or bool(self.get("herringbone", False)) # Not migrated yet
 
 def set_herringbone(self, value):
-	plancher = bpy.data.objects[self.id_data.name]
-	plancher.Plancher.lock_length = value
-	self["herringbone"] = value
+	if value:
+		self.floor_type = "Herringbone"
+	elif self.floor_type == "Herringbone":
+		self.floor_type = DEFAULT_PATTERN
+
+def migrate_herringbone(cobj):
+	props = cobj.Plancher
+	if "herringbone" not in props:
+		return
+	if props["herringbone"]:
+		props["floor_type"] = patterns["Herringbone"]["index"]            # ID property : no rebuild, the mesh is already this floor
+	del props["herringbone"]
+
+@persistent
+def migrate_objects(*args):
+	for cobj in bpy.data.objects:
+		migrate_herringbone(cobj)
+	return None                                                           # Also a timer : once
 
 # -------------------------------------------------------------------- #
 def update_type(self,context):
 	"""Update the type of floor """
-
-	parquet = bpy.data.objects[self.id_data.name]
-	if plancher.Plancher.floor_type == "Stack Bond":
-		create_stack_bond(parquet)
-
-
-
-# -------------------------------------------------------------------- #
-def create_stack_bond(parquet):
-	"""Create a Stack Bond type of floor """
-
-	bpy.ops.mesh.primitive_cube_add()
-	context.active_object.name = "Parquet"
-	parquet = context.object
-	parquet.Plancher.nbrboards = 2
-
-
-
-
-
-
-
-
-
-
-	x = 0
-	y = 0
-	verts = []
-	faces = []
-	listinter = []
-	start = 0
-	left = 0
-	bool_translatey = True
-	end = lengthboard
-	interleft = 0
-	interright = 0
-
-
-	if gapy == 0:
-		fill_gap_y = False
-
-	if herringbone:
-		shifty = 0
-		tilt = math.radians(45)
-		randwith = 0
-		fill_gap_y = False
-
-	# Compute the new length and width of the board if tilted
-	hyp, translatex, translatey = calculangle(tilt, width, lengthboard)
-
-	randwidth = hyp + (randwith * randuni(0, hyp))
-	right = randwidth
-	end = translatey - (translatey * randuni(randomshift, shifty))
-
-	if herringbone or lock_length:
-		floor_length = (nbr_length * (translatey + gapy)) - gapy
-	noglue = gapx
-	#------------------------------------------------------------
-	# Loop for the boards on the X axis
-	#------------------------------------------------------------
-	while x < nbrboards:
-		x += 1
-
-		if glue and (x % nbrshift != 0):
-			gapx = gaptrans
-		else:
-			gapx = noglue
-
-
-		if (x % nbrshift != 0): bool_translatey = not bool_translatey
-		if end > floor_length :
-			end = floor_length
-
-		# Creation of the first board
-		nbvert = len(verts)
-		verts.extend(board(start, left, right, end, tilt, translatex, hyp, herringbone, gapy, height, randheight))
-		faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
-
-		# Start a new column (Y)
-		start2 = end + gapy
-		end2 = start2
-		#------------------------------------------------------------
-		# TRANSVERSAL
-		#------------------------------------------------------------
-		# listinter = List of the length (left) of the interval || x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
-		# The modulo (%) is here to determined if the actual interval has to be shift
-		listinter.append(left)
-		endfloor = 0
-		if x == nbrboards: endfloor = right
-		if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end < floor_length) and not locktrans:
-			if start2 > floor_length:
-				start2 = floor_length
-			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-		elif fill_gap_y and (x == nbrboards) and locktrans:
-			if start2 > floor_length: start2 = floor_length
-			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-		#------------------------------------------------------------
-		# BORDERS
-		#------------------------------------------------------------
-		# Create the borders in the X gap if boards are glued
-		if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
-			nbvert = len(verts)
-			verts.extend(border(right+gaptrans, right+noglue-gaptrans, start, gapy, end, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey))
-			faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
-
-		#------------------------------------------------------------
-		# Loop for the boards on the Y axis
-		#------------------------------------------------------------
-		while floor_length > end2 :
-			if end2 > floor_length :
-				end2 = floor_length
-
-			if tilt < 0:
-				tilt = tilt * (-1)
-			else:
-				tilt = -tilt
-
-			# Creation of the board
-			nbvert = len(verts)
-			verts.extend(board(start2, left, right, end2, tilt, translatex, hyp, herringbone, gapy, height, randheight))
-			faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
-
-			#------------------------------------------------------------
-			# BORDERS
-			#------------------------------------------------------------
-			# Create the borders in the X gap if boards are glued
-			if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
-				nbvert = len(verts)
-				verts.extend(border(right+gaptrans, right+noglue-gaptrans, start2, gapy, end2, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey))
-				faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
-
-			# New column
-			start2 += translatey + gapy
-
-			#------------------------------------------------------------
-			# TRANSVERSAL
-			#------------------------------------------------------------
-			# x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
-			# The modulo (%) is  here to determined if the actual interval as to be shift
-			endfloor = 0
-			if x == nbrboards: endfloor = right
-			if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end2 < floor_length) and not locktrans:
-				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
-				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-			elif fill_gap_y and locktrans and (x == nbrboards) and (end2 < floor_length) :
-				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
-				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-			end2 = start2
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Increment / initialize
-		#------------------------------------------------------------
-		if (x % nbrshift == 0) and not locktrans:
-			listinter = []
-		if not herringbone:
-			left += gapx
-			right += gapx
-		else:
-			right += gapy * 2
-			left += gapy * 2
-		left += randwidth
-		randwidth = hyp + (randwith * randuni(0, hyp))
-		right += randwidth
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Shift on the Y axis
-		#------------------------------------------------------------
-		# bool_translatey is turn on and off at each new column to reverse the direction of the shift up or down.
-		if (bool_translatey and shifty > 0):
-			if (x % nbrshift == 0 ):
-				end = translatey * randuni(randomshift, shifty)
-			bool_translatey = False
-		else:
-			if (x % nbrshift == 0 ):
-				end = translatey - (translatey * randuni(randomshift, shifty))
-			bool_translatey = True
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Herringbone only
-		#------------------------------------------------------------
-		# Invert the value of the tilted parameter
-		if tilt < 0:
-		   tilt = tilt * (-1)
-		#------------------------------------------------------------#
-
-	#------------------------------------------------------------         # End of the loop on X axis
-	return verts, faces
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+	schedule_plancher(self, context)
 
 #############################################################
-# FLOOR BOARD
+# MESH
 #############################################################
-# Creation of a column of boards
-
-def parquet(lock_length, nbrboards, nbr_length, height, randheight, width, randwith, gapx, lengthboard, gapy, shifty, nbrshift, tilt, herringbone, randoshifty, floor_length, fill_gap_y, gaptrans, randgaptrans, glue, borders, lengthtrans, locktrans, nbrtrans):
-
-	x = 0
-	y = 0
-	verts = []
-	faces = []
-	listinter = []
-	start = 0
-	left = 0
-	bool_translatey = True                                                # shifty = 0
-	end = lengthboard
-	interleft = 0
-	interright = 0
-	if locktrans:
-		shifty = 0                                                        # No shift with unlock !
-		glue = False
-		borders = False
-	if shifty: locktrans = False                                          # Can't have the boards shifted and the tranversal unlocked
-	if randoshifty > 0:                                                   # If randomness in the shift of the boards
-		randomshift = shifty * (1-randoshifty)                            # Compute the amount of randomness in the shift
-	else:
-		randomshift = shifty                                              # No randomness
-
-	if shifty > 0:
-		tilt = 0
-		herringbone = False
-
-	if gapy == 0:                                                         # If no gap on the Y axis : the transversal is not possible
-		fill_gap_y = False
-	if herringbone:                                                       # Constraints if herringbone is choose :
-		shifty = 0                                                        # - no shift
-		tilt = math.radians(45)                                           # - Tilt = 45°
-		randwith = 0                                                      # - No random on the width
-		fill_gap_y = False                                                     # - No transversal
-
-	# Compute the new length and width of the board if tilted
-	hyp, translatex, translatey = calculangle(tilt, width, lengthboard)
-
-	randwidth = hyp + (randwith * randuni(0, hyp))                        # Randomness in the width
-	right = randwidth                                                     # Right = width of the board
-	end = translatey - (translatey * randuni(randomshift, shifty))        # Randomness in the length
-
-	if herringbone or lock_length:                                        # Compute the length of the floor based on the length of the boards
-		floor_length = (nbr_length * (translatey + gapy)) - gapy
-	noglue = gapx
-	#------------------------------------------------------------
-	# Loop for the boards on the X axis
-	#------------------------------------------------------------
-	while x < nbrboards:                                                  # X axis
-		x += 1
+# Fill an empty mesh with foreach_set, without any python object per vertex.
+# If the faces don't share their vertices, each face is a ring of edges,
+# edge i goes from loop i to the next loop of the same face. Else (solids)
+# the loops of the same two vertices share one edge.
+
+def fill_mesh(mesh, co, loop_verts, loop_starts, loop_totals):
+	nloops = len(loop_verts)
+	nverts = len(co) // 3
+	following = np.arange(1, nloops + 1, dtype=np.int32)
+	following[loop_starts + loop_totals - 1] = loop_starts                # The last loop of a face goes back to the first one
+	edges = np.empty((nloops, 2), dtype=np.int32)
+	edges[:, 0] = loop_verts
+	edges[:, 1] = loop_verts[following]
+	if nverts == nloops:
+		loop_edges = np.arange(nloops, dtype=np.int32)
+	else:                                                                 # Shared vertices : unique edges
+		keys = np.sort(edges, axis=1).astype(np.int64)
+		keys, loop_edges = np.unique(keys[:, 0] * nverts + keys[:, 1], return_inverse=True)
+		edges = np.stack((keys // nverts, keys % nverts), axis=1).astype(np.int32)
+		loop_edges = loop_edges.astype(np.int32)
+
+	mesh.vertices.add(nverts)
+	mesh.edges.add(len(edges))
+	mesh.loops.add(nloops)
+	mesh.polygons.add(len(loop_totals))
+	mesh.vertices.foreach_set("co", co)
+	mesh.edges.foreach_set("vertices", edges.ravel())
+	mesh.loops.foreach_set("vertex_index", loop_verts)
+	mesh.loops.foreach_set("edge_index", loop_edges)
+	mesh.polygons.foreach_set("loop_start", loop_starts)
+	mesh.polygons.foreach_set("loop_total", loop_totals)
+	mesh.update(calc_edges=False)
+
+def same_topology(mesh, nverts, loop_totals, loop_verts=None):
+	"""True if the mesh has these vertices and faces, and its loops these vertices"""
+	nloops = int(np.sum(loop_totals))
+	if len(mesh.vertices) != nverts or len(mesh.polygons) != len(loop_totals) or len(mesh.loops) != nloops:
+		return False
+	totals = np.empty(len(loop_totals), dtype=np.int32)
+	mesh.polygons.foreach_get("loop_total", totals)
+	if not np.array_equal(totals, loop_totals):
+		return False
+	if loop_verts is None:                                                # The vertices of a face follow each other
+		loop_verts = np.arange(nloops, dtype=np.int32)
+	verts = np.empty(nloops, dtype=np.int32)
+	mesh.loops.foreach_get("vertex_index", verts)                         # Same counts, other faces (solids, cut boards)
+	return np.array_equal(verts, loop_verts)
+
+# Write the buffers in the mesh of the object instead of creating a new one.
+# If the topology didn't change, only the coordinates are written,
+# else the geometry is cleared and filled again in the same datablock.
+# Return True if the topology changed.
+
+def update_mesh(mesh, co, loop_verts, loop_starts, loop_totals):
+	if same_topology(mesh, len(co) // 3, loop_totals, loop_verts):
+		mesh.vertices.foreach_set("co", co)
+		mesh.update()
+		return False
 
-		if glue and (x % nbrshift != 0):
-			gapx = gaptrans
-		else:
-			gapx = noglue
-
-
-		if (x % nbrshift != 0): bool_translatey = not bool_translatey     # Invert the shift
-		if end > floor_length :                                          # Cut the last board if it's > than the floor
-			end = floor_length
-
-		# Creation of the first board
-		nbvert = len(verts)
-		verts.extend(board(start, left, right, end, tilt, translatex, hyp, herringbone, gapy, height, randheight))
-		faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
-
-		# Start a new column (Y)
-		start2 = end + gapy
-		end2 = start2
-		#------------------------------------------------------------
-		# TRANSVERSAL
-		#------------------------------------------------------------
-		# listinter = List of the length (left) of the interval || x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
-		# The modulo (%) is here to determined if the actual interval has to be shift
-		listinter.append(left)                                            # Keep the length of the actual interval
-		endfloor = 0
-		if x == nbrboards: endfloor = right
-		if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end < floor_length) and not locktrans:
-			if start2 > floor_length:
-				start2 = floor_length             # Cut the board if it's > than the floor
-			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-		elif fill_gap_y and (x == nbrboards) and locktrans:
-			if start2 > floor_length: start2 = floor_length             # Cut the board if it's > than the floor
-			transversal(listinter[0], right, end, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-		#------------------------------------------------------------
-		# BORDERS
-		#------------------------------------------------------------
-		# Create the borders in the X gap if boards are glued
-		if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
-			nbvert = len(verts)
-			verts.extend(border(right+gaptrans, right+noglue-gaptrans, start, gapy, end, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey))
-			faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
-
-		#------------------------------------------------------------
-		# Loop for the boards on the Y axis
-		#------------------------------------------------------------
-		while floor_length > end2 :                                      # Y axis
-			end2 = start2 + translatey                                    # New column
-			if end2 > floor_length :                                     # Cut the board if it's > than the floor
-				end2 = floor_length
-
-			if tilt < 0:                                                  # This part is used to inversed the tilt of the boards
-				tilt = tilt * (-1)
-			else:
-				tilt = -tilt
-
-			# Creation of the board
-			nbvert = len(verts)
-			verts.extend(board(start2, left, right, end2, tilt, translatex, hyp, herringbone, gapy, height, randheight))
-			faces.append((nbvert,nbvert+1, nbvert+2, nbvert+3))
-
-			#------------------------------------------------------------
-			# BORDERS
-			#------------------------------------------------------------
-			# Create the borders in the X gap if boards are glued
-			if borders and glue and (x % nbrshift == 0) and translatex == 0 and (x != nbrboards) and (shifty == 0) and (gaptrans*2 < gapx):
-				nbvert = len(verts)
-				verts.extend(border(right+gaptrans, right+noglue-gaptrans, start2, gapy, end2, height, randheight, gaptrans, randgaptrans, floor_length, start2 + translatey))
-				faces.append((nbvert, nbvert+1, nbvert+2, nbvert+3, nbvert+4, nbvert+5))
-
-			# New column
-			start2 += translatey + gapy
-
-			#------------------------------------------------------------
-			# TRANSVERSAL
-			#------------------------------------------------------------
-			# x = nbr of the actual column || nbrshift = nbr of columns to shift || nbrboards = Total nbr of column
-			# The modulo (%) is  here to determined if the actual interval as to be shift
-			endfloor = 0
-			if x == nbrboards: endfloor = right
-			if fill_gap_y and ((x % nbrshift == 0) or ((x % nbrshift != 0) and (x == nbrboards))) and (end2 < floor_length) and not locktrans:
-				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
-				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-			elif fill_gap_y and locktrans and (x == nbrboards) and (end2 < floor_length) :
-				if start2 > floor_length: start2 = floor_length         # Cut the board if it's > than the floor
-				transversal(listinter[0], right, end2, tilt, translatex, gapy, noglue, gaptrans, randgaptrans, start2, nbrtrans, verts, faces, locktrans, lengthtrans, height, randheight, borders, endfloor, shifty)
-
-			end2 = start2                                                 # End of the loop on Y axis
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Increment / initialize
-		#------------------------------------------------------------
-		if (x % nbrshift == 0) and not locktrans: listinter = []          # Initialize the list of interval if the nbr of boards to shift is reaches
-		if not herringbone:                                               # If not herringbone
-			left += gapx                                                  #  Add the value of gapx to the left side of the boards
-			right += gapx                                                 #  Add the value of gapx to the right side of the boards
-		else:                                                             # If herringbone, we don't use the gapx anymore in the panel
-			right += gapy * 2                                             #  used only the gapy
-			left += gapy * 2                                              #  ""     ""      ""
-		left += randwidth                                                 # Add randomness on the left side of the boards
-		randwidth = hyp + (randwith * randuni(0, hyp))                    # Compute the new randomness on the width (hyp)
-		right += randwidth                                                # Add randomness on the right side of the boards
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Shift on the Y axis
-		#------------------------------------------------------------
-		# bool_translatey is turn on and off at each new column to reverse the direction of the shift up or down.
-		if (bool_translatey and shifty > 0):                              # If the columns are shifted
-			if (x % nbrshift == 0 ):                                      # If the nbr of column to shift is reach
-				end = translatey * randuni(randomshift, shifty)           # Compute and add the randomness to the new end (translatey) shifted
-			bool_translatey = False                                       # Turn on the boolean, so it will be inverted for the next colmun
-		else:
-			if (x % nbrshift == 0 ):
-				end = translatey - (translatey * randuni(randomshift, shifty)) # Compute and add the randomness to the new end (translatey) shifted
-			bool_translatey = True                                        # Turn on the boolean, so it will be inverted for the next colmun
-		#------------------------------------------------------------#
-
-		#------------------------------------------------------------
-		# Herringbone only
-		#------------------------------------------------------------
-		# Invert the value of the tilted parameter
-		if tilt < 0:                                                      # The tilted value is inverted at each column
-		   tilt = tilt * (-1)                                             # so the boards will be reverse
-		#------------------------------------------------------------#
-
-	#------------------------------------------------------------         # End of the loop on X axis
-	return verts, faces
+	if hasattr(mesh, "clear_geometry"):
+		mesh.clear_geometry()
+	else:                                                                 # Blender < 2.81
+		bm = bmesh.new()
+		bm.to_mesh(mesh)
+		bm.free()
+	fill_mesh(mesh, co, loop_verts, loop_starts, loop_totals)
+	return True
+
+# Only the height of the boards changed : the Z column is written in the
+# coordinates of the mesh, X and Y are kept.
+# Return False if the mesh isn't this floor, it has to be rebuilt.
+
+def update_heights(mesh, z, sizes):
+	if not same_topology(mesh, len(z), sizes):
+		return False
+	co = np.empty(len(z) * 3, dtype=np.float32)
+	mesh.vertices.foreach_get("co", co)
+	co[2::3] = z
+	mesh.vertices.foreach_set("co", co)
+	mesh.update()
+	return True
 
 #############################################################
 # PANEL PRINCIPAL
@@ -719,12 +221,19 @@ class MAIN_PT_Plancher(bpy.types.Panel):
 			#Seed color
 			row = col.row(align=True)
 			row.prop(cobj.Plancher, "colseed")
+			#Vertex groups
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "colgroups", icon='BLANK1')
 			#layout.label('Plancher only works in Object Mode.')
 		elif myObj and myObj.name == 'Plancher'  :
 			#-------------------------------------------------------------FLOOR
 			col = layout.column(align=True)
 			col.label(text="SURFACE")
 			row = col.row(align=True)
+			row.prop(cobj.Plancher, "floor_type")
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "outline")
+			row = col.row(align=True)
 			row.prop(cobj.Plancher, "lock_length", icon='BLANK1')
 			row = col.row(align=True)
 			if cobj.Plancher.lock_length:
@@ -734,6 +243,10 @@ class MAIN_PT_Plancher(bpy.types.Panel):
 			row = col.row(align=True)
 			row.prop(cobj.Plancher, "height")
 			row.prop(cobj.Plancher, "randheight")
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "solid", icon='BLANK1')
+			if cobj.Plancher.solid:
+				row.prop(cobj.Plancher, "chamfer")
 
 			col = layout.column()
 			col = layout.column(align=True)
@@ -820,6 +333,29 @@ class MAIN_PT_Plancher(bpy.types.Panel):
 			col.label(text="SEED")
 			row = col.row(align=True)
 			row.prop(cobj.Plancher, "colseed")
+			row.prop(cobj.Plancher, "randseed")
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "uvoffset")
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "engine")
+			row = col.row(align=True)
+			row.prop(cobj.Plancher, "lod")
+			if cobj.Plancher.lod == 'AUTO':
+				row.prop(cobj.Plancher, "lod_boards")
+
+			#-------------------------------------------------------------PROFILE
+			run = profile_last(cobj.name)
+			if run is not None:                                           # Last update of this floor
+				col = layout.column()
+				col = layout.column(align=True)
+				col.label(text="LAST UPDATE (%s) : %.1f ms" % (run["kind"], run["total"] * 1000))
+				for name, seconds in run["stages"].items():
+					col.label(text="%s : %.1f ms" % (name.capitalize(), seconds * 1000))
+				col.label(text="%d boards, %d vertices, %d faces" % (run["boards"], run["vertices"], run["faces"]))
+				if run["peak"] is not None:
+					col.label(text="Memory peak : %.1f MB" % (run["peak"] / 2**20))
+				if run["warning"] is not None:
+					col.label(text=run["warning"], icon='ERROR')
 
 			#-------------------------------------------------------------UV / VERTEX
 			# Warning, 'cause all the parameters are lost when going back to Object mode...
@@ -827,206 +363,663 @@ class MAIN_PT_Plancher(bpy.types.Panel):
 			col = layout.column()
 			col = layout.column()
 			col = layout.column(align=True)
-			col.label(text="Go in edit mode for UV !")
+			col.label(text="Go in edit mode for the colors !")
 			col.label(text="Warning ! Any change here will reset the uv/color !")
 
 #############################################################
-# FUNCTION PLANCHER
+# PARAMETERS
+#############################################################
+# Parameters of parquet() / parquet_array() from the properties of an object,
+# followed by the pattern (core.patterns)
+
+def plancher_params(cobj):
+	return (cobj.Plancher.lock_length,
+			cobj.Plancher.nbrboards,
+			cobj.Plancher.nbr_length,
+			cobj.Plancher.height,
+			cobj.Plancher.randheight,
+			cobj.Plancher.width,
+			cobj.Plancher.randwith,
+			cobj.Plancher.gapx,
+			cobj.Plancher.lengthboard,
+			cobj.Plancher.gapy,
+			cobj.Plancher.shifty,
+			cobj.Plancher.nbrshift,
+			cobj.Plancher.tilt,
+			cobj.Plancher.herringbone,
+			cobj.Plancher.randoshifty,
+			cobj.Plancher.floor_length,
+			cobj.Plancher.fill_gap_y,
+			cobj.Plancher.gaptrans,
+			cobj.Plancher.randgaptrans,
+			cobj.Plancher.glue,
+			cobj.Plancher.borders,
+			cobj.Plancher.lengthtrans,
+			cobj.Plancher.locktrans,
+			cobj.Plancher.nbrtrans,
+			cobj.Plancher.randseed,
+			cobj.Plancher.floor_type,)
+
+#############################################################
+# VERTEX COLOR / VERTEX GROUP
 #############################################################
-def create_plancher(self,context):
-	context.preferences.edit.use_global_undo = False
-	obj_mode = context.active_object.mode
-	bpy.ops.object.mode_set(mode='OBJECT')
-	context.scene.unit_settings.system = 'METRIC'
-	cobj = context.object
-	verts, faces = parquet(cobj.Plancher.lock_length,
-						   cobj.Plancher.nbrboards,
-						   cobj.Plancher.nbr_length,
-						   cobj.Plancher.height,
-						   cobj.Plancher.randheight,
-						   cobj.Plancher.width,
-						   cobj.Plancher.randwith,
-						   cobj.Plancher.gapx,
-						   cobj.Plancher.lengthboard,
-						   cobj.Plancher.gapy,
-						   cobj.Plancher.shifty,
-						   cobj.Plancher.nbrshift,
-						   cobj.Plancher.tilt,
-						   cobj.Plancher.herringbone,
-						   cobj.Plancher.randoshifty,
-						   cobj.Plancher.floor_length,
-						   cobj.Plancher.fill_gap_y,
-						   cobj.Plancher.gaptrans,
-						   cobj.Plancher.randgaptrans,
-						   cobj.Plancher.glue,
-						   cobj.Plancher.borders,
-						   cobj.Plancher.lengthtrans,
-						   cobj.Plancher.locktrans,
-						   cobj.Plancher.nbrtrans,)
-
-	# Code from Michel Anders script Floor Generator
-	# Create mesh & link object to scene
-	emesh = cobj.data
-
-	mesh = bpy.data.meshes.new("Plancher_mesh")
-	mesh.from_pydata(verts, [], faces)
-	mesh.update(calc_edges=True)
-
-	for i in bpy.data.objects:
-		if i.data == emesh:
-			i.data = mesh
-
-	name = emesh.name
-	emesh.user_clear()
-	bpy.data.meshes.remove(emesh)
-	mesh.name = name
-
-	#---------------------------------------------------------------------COLOR & UV
-	if obj_mode =='EDIT':                                                 # If we are in 'EDIT MODE'
-		seed(cobj.Plancher.colseed)                                            # New random distribution
-		# mesh.uv_textures.new("Txt_Plancher")                          # New UV map
-		mesh.uv_layers.new(name="Txt_Plancher")                          # New UV map
-		# cobj.data.uv_layers.new(name="Txt_Plancher")                    # New UV map
-		vertex_colors = mesh.vertex_colors.new().data                 # New vertex color
-		rgb = []
-
-		if cobj.Plancher.colrand > 0:                                          # If random color
-			for i in range(cobj.Plancher.colrand):
-				color = [round(rand(),1), round(rand(),1), round(rand(),1), 1] # Create as many random color as in the colrand variable
-				rgb.append(color)                                     # Keep all the colors in the RGB variable
-
-		elif cobj.Plancher.colphase > 0:                                       # If phase color
-			for n in range(cobj.Plancher.colphase):
-				color = [round(rand(),1), round(rand(),1), round(rand(),1), 1] # Create as many random color as in the colphase variable
-				rgb.append(color)                                     # Keep all the colors in the RGB variable
-
-	#---------------------------------------------------------------------VERTEX GROUP
-		bpy.context.object.vertex_groups.clear()                      # Clear vertex group if exist
-		if cobj.Plancher.colrand == 0 and cobj.Plancher.colphase == 0:                  # Create the first Vertex Group
-			bpy.context.object.vertex_groups.new()
-		elif cobj.Plancher.colrand > 0:                                        # Create as many VG as random color
-			for v in range(cobj.Plancher.colrand):
-				bpy.context.object.vertex_groups.new()
-		elif cobj.Plancher.colphase > 0:                                       # Create as many VG as phase color
-			for v in range(cobj.Plancher.colphase):
-				bpy.context.object.vertex_groups.new()
+# The colors of the boards come from board_colors(), for all the boards
+# at once. The color of a board is copied to its corners (loops) with
+# the face index of each loop, and written with one foreach_set.
+# The vertex groups are built from the vertex indices of the loops.
+
+def plancher_colors(cobj, mesh):
+	nbpoly = len(mesh.polygons)
+	sizes = np.empty(nbpoly, dtype=np.int32)
+	mesh.polygons.foreach_get("loop_total", sizes)
+	boards = mesh_boards(mesh)
 
 	#---------------------------------------------------------------------VERTEX COLOR
-		phase = cobj.Plancher.colphase
-		color = {}
-		for poly in mesh.polygons:                                    # For each polygon of the mesh
-
-			if cobj.Plancher.colrand == 0 and cobj.Plancher.colphase == 0:              # If no color
-				color = [rand(), rand(), rand(), 1]                      # Create at least one random color
-
-			elif cobj.Plancher.colrand > 0:                                    # If random color
-
-				if cobj.Plancher.allrandom:                                    # If all random choose
-					nbpoly = len(mesh.polygons.items())               # Number of boards
-					randvg = randint(0,cobj.Plancher.colrand)                  # Random vertex group
-					for i in range(nbpoly):
-						color = [round(rand(),1), round(rand(),1), round(rand(), 1), 1]     # Create as many random color as in the colrand variable
-						rgb.append(color)                             # Keep all the colors in the RGB variable
-
-				else:
-					color = rgb[randint(0,cobj.Plancher.colrand-1)]            # Take one color ramdomly from the RGB list
-
-
-				for loop_index in poly.loop_indices:                  # For each vertice from this polygon
-					vertex_colors[loop_index].color = color           # Assign the same color
-					if cobj.Plancher.allrandom:                                # If all random choose
-						vg = bpy.context.object.vertex_groups[randvg-1] # Assign a random vertex group
-					else:
-						vg = bpy.context.object.vertex_groups[rgb.index(color)] # Else assign a vertex group by color index
-					vg.add([loop_index], 1, "ADD")                    # index, weight, operation
-
-			elif cobj.Plancher.colphase > 0:                                   # If phase color
-				color = rgb[phase-1]                                  # Take the last color from the RGB list
-				phase -= 1                                            # Substract 1 from the phase number
-				if phase == 0: phase = cobj.Plancher.colphase                  # When phase = 0, start again from the beginning to loop in the rgb list
-
-				for loop_index in poly.loop_indices:                  # For each vertice from this polygon
-					vertex_colors[loop_index].color = color           # Assign the same color
-					vg = bpy.context.object.vertex_groups[rgb.index(color)]
-					vg.add([loop_index], 1, "ADD")                    # index, weight, operation
-		color.clear()                                                 # Clear the color list
-
-
-		#-----------------------------------------------------------------UV UNWRAP
-		ob = bpy.context.object
-		ob.select_set(True)
-		bpy.ops.object.mode_set(mode='EDIT')
-		bpy.ops.uv.unwrap(method='ANGLE_BASED', correct_aspect=True)
-		#-----------------------------------------------------------------UV LAYER
-		me = ob.data
-		bm = bmesh.from_edit_mesh(me)
-		uv_lay = bm.loops.layers.uv.verify()
-
-		#-----------------------------------------------------------------GROUP UV
-		# Group all the UV points at the origin point
-		# Need more work, it's not working everytimes, don't know why...
-		v = 0
-		tpuvx = {}
-		tpuvy = {}
-		for face in bm.faces:                                             # For each polygon
-			for loop in face.loops:                                       # For each loop
-				luv = loop[uv_lay]
-				v += 1
-				uv = loop[uv_lay].uv                                      # Keep the coordinate of the uv point
-				tpuvx[uv.x] = loop.index                                  # Keep the X coordinate of the uv point
-				tpuvy[uv.y] = loop.index                                  # Keep the Y coordinate of the uv point
-
-				if v > 3:                                                 # When the last uv point of this polygon is reached
-					minx = min(tpuvx.keys())                              # Keep the smallest value on the X axis from the 4 uv point
-					miny = min(tpuvy.keys())                              # Keep the smallest value on the Y axis from the 4 uv point
-					for loop in face.loops:                               # A new loop in the loop ... really need more work
-						loop[uv_lay].uv[0] -= minx                        # For each UV point, substract the value of the smallest X
-						loop[uv_lay].uv[1] -= miny                        # For each UV point, substract the value of the smallest Y
-					v = 0                                                 # Initialize counter
-			tpuvx.clear()                                                 # Clear the list
-			tpuvy.clear()                                                 # Clear the list
-
-		bmesh.update_edit_mesh(me)                                        # Update the mesh
+	with stage("colors"):
+		colors, groups = board_colors(int(boards.max()) + 1 if nbpoly else 0, cobj.Plancher.colseed, cobj.Plancher.colrand, cobj.Plancher.colphase, cobj.Plancher.allrandom)
+		vertex_colors = (mesh.vertex_colors.active or mesh.vertex_colors.new()).data # New vertex color
+		loop_faces = np.repeat(boards, sizes)                             # Board of each loop
+		vertex_colors.foreach_set("color", colors[loop_faces].ravel())
+
+	with stage("vertex groups"):
+		plancher_vertex_groups(cobj, mesh, groups, loop_faces)
+
+#---------------------------------------------------------------------VERTEX GROUP
+def plancher_vertex_groups(cobj, mesh, groups, loop_faces):
+	cobj.vertex_groups.clear()                                            # Clear vertex group if exist
+	if not cobj.Plancher.colgroups:                                       # Only on demand, board_id / board_rand are lighter
+		return
+	for v in range(max(cobj.Plancher.colrand, cobj.Plancher.colphase, 1)): # As many VG as colors, at least one
+		cobj.vertex_groups.new()
+	if cobj.Plancher.colrand == 0 and cobj.Plancher.colphase == 0:        # No color, nothing in the group
+		return
+
+	# The vertices sorted by group, then one add() per group
+	loop_verts = np.empty(len(loop_faces), dtype=np.int32)
+	mesh.loops.foreach_get("vertex_index", loop_verts)
+	vert_groups = np.full(len(mesh.vertices), len(cobj.vertex_groups), dtype=np.int32) # Loose vertices after the last group
+	vert_groups[loop_verts] = groups[loop_faces]                          # Group of the board of each vertex
+	order = np.argsort(vert_groups, kind='stable')
+	ends = np.cumsum(np.bincount(vert_groups, minlength=len(cobj.vertex_groups) + 1))
+	for vg, indices in zip(cobj.vertex_groups, np.split(order, ends[:-1])):
+		if len(indices):
+			vg.add(indices.tolist(), 1.0, 'REPLACE')                      # index, weight, operation
 
+#############################################################
+# BOARD ATTRIBUTES
+#############################################################
+# Two face attributes, for the shaders / Geometry Nodes : 'board_id' the
+# index of the board and 'board_rand' a random value of the board (color
+# seed). Lighter than the vertex groups : one value per face.
+# 1 face per board, except for the solids (their faces give the board).
+
+def face_layer(mesh, name, data_type):
+	"""Data of the face attribute 'name' ('INT' or 'FLOAT'), created if missing"""
+	if hasattr(mesh, "attributes"):                                       # Blender >= 2.91
+		attribute = mesh.attributes.get(name)
+		if attribute is not None and (attribute.domain != 'FACE' or attribute.data_type != data_type):
+			mesh.attributes.remove(attribute)
+			attribute = None
+		if attribute is None:
+			attribute = mesh.attributes.new(name, data_type, 'FACE')
+		return attribute.data
+	layers = mesh.polygon_layers_int if data_type == 'INT' else mesh.polygon_layers_float
+	return (layers.get(name) or layers.new(name=name)).data
+
+def mesh_boards(mesh):
+	"""Board of each face, from the 'board_id' attribute if the mesh has it"""
+	nbpoly = len(mesh.polygons)
+	boards = np.arange(nbpoly, dtype=np.int32)
+	if hasattr(mesh, "attributes"):                                       # Blender >= 2.91
+		found = "board_id" in mesh.attributes
 	else:
-		bpy.ops.object.mode_set(mode='OBJECT')                            # We are in 'OBJECT MODE' here, nothing to do
+		found = "board_id" in mesh.polygon_layers_int
+	if found:
+		face_layer(mesh, "board_id", 'INT').foreach_get("value", boards)
+	return boards
+
+def plancher_end(mesh):
+	"""Finish the run with the number of boards of the mesh : several faces per board with the solids or the outline"""
+	if profile["run"] is None:
+		return None
+	return profile_end(len(np.unique(mesh_boards(mesh))), len(mesh.vertices), len(mesh.polygons))
+
+def plancher_attributes(cobj, mesh, boards=None):
+	if boards is None:
+		boards = mesh_boards(mesh)
+	nboards = int(boards.max()) + 1 if len(boards) else 0
+	face_layer(mesh, "board_id", 'INT').foreach_set("value", np.ascontiguousarray(boards, dtype=np.int32))
+	face_layer(mesh, "board_rand", 'FLOAT').foreach_set("value", board_random(nboards, cobj.Plancher.colseed)[boards])
+
+#############################################################
+# UV
+#############################################################
+# The UV of the boards are computed from the coordinates of the loops
+# and the board of each face by board_uvs() and written with one
+# foreach_set : no unwrap operator, no 'EDIT MODE'.
+
+def plancher_uv(cobj, mesh, boards=None):
+	if boards is None:
+		boards = mesh_boards(mesh)
+	uv_layer = mesh.uv_layers.get("Txt_Plancher") or mesh.uv_layers.new(name="Txt_Plancher") # The mesh is kept, so the layer may already exist
+	co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+	mesh.vertices.foreach_get("co", co)
+	loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+	mesh.loops.foreach_get("vertex_index", loop_verts)
+	loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+	mesh.polygons.foreach_get("loop_start", loop_starts)
+	uv = board_uvs(co.reshape(-1, 3)[loop_verts], loop_starts, cobj.Plancher.colseed, cobj.Plancher.uvoffset, boards)
+	uv_layer.data.foreach_set("uv", uv.ravel())
 
-	#---------------------------------------------------------------------MODIFIERS
+#############################################################
+# FUNCTION PLANCHER
+#############################################################
+def create_plancher(self, context, background=False, unit=None):
+	cobj = self.id_data                                                   # The object of the properties, may be rebuilt from a timer
+	obj_mode = cobj.mode
+	profile_start(cobj.name, 'GEOMETRY')
+	migrate_herringbone(cobj)                                             # An object from an old file
+	params = plancher_params(cobj)
+
+	#---------------------------------------------------------------------BUDGET
+	proxy = plancher_proxy(cobj, params)                                  # The proxy is one face per column : no budget
+	if unit is None:                                                      # Else already counted when the job was submitted
+		job_cancel(cobj.name)                                             # This run is newer than the job in flight
+		if not proxy and plancher_refused(params):                        # The mesh is kept as it is
+			preview_restore(cobj)                                         # Not the window of the preview
+			plancher_end(cobj.data)
+			return
+	cobj.Plancher.proxy = proxy                                           # Saved with the object, like its mesh
+
+	#---------------------------------------------------------------------BACKGROUND
+	if background and not proxy and not layout_cached(params):           # The mesh is written when the layout is there
+		with stage("submit"):
+			generation = job_submit(cobj.name, params, cobj.Plancher.engine)
+		if not bpy.app.timers.is_registered(apply_layouts):
+			bpy.app.timers.register(apply_layouts, first_interval=jobs_interval)
+		profile_warning("Layout in the background (job %d)" % generation)
+		plancher_end(cobj.data)
+		return
+
+	if not mode_ready(cobj):                                              # In 'EDIT MODE' but not active : later
+		defer(cobj, 'GEOMETRY')
+		profile_warning("Deferred : the object is in 'EDIT MODE' and not active")
+		plancher_end(cobj.data)
+		return
+
+	preview_restore(cobj)                                                 # The floor is written in its own mesh
+	with object_mode(cobj, undo=False):
+		context.scene.unit_settings.system = 'METRIC'
+		plancher_mesh(cobj, params, proxy, unit)
+		mesh = cobj.data
+
+		#-----------------------------------------------------------------COLOR
+		if obj_mode == 'EDIT' and not proxy:                              # If we are in 'EDIT MODE'
+			plancher_colors(cobj, mesh)
+	plancher_end(mesh)
+
+#---------------------------------------------------------------------MODE
+# The mesh is written in 'OBJECT MODE'. The rebuilds run from timers,
+# and bpy.ops.object.mode_set() acts on the active object, not on cobj :
+# the mode is only switched if cobj is in another mode, and then only if
+# cobj is the active object. Else the run is deferred until it is
+# (mode_ready(), defer()). The mode and the global undo come back even
+# if the run fails.
+
+def mode_ready(cobj):
+	"""True if the mesh of cobj can be written now"""
+	return cobj.mode == 'OBJECT' or cobj == bpy.context.view_layer.objects.active
+
+def defer(cobj, stage):
+	"""Run the stage of cobj again from the regeneration timer"""
+	regen["dirty"].setdefault(cobj.name, set()).add(stage)
+	if not bpy.app.timers.is_registered(regenerate):
+		bpy.app.timers.register(regenerate, first_interval=regen_delay)
+
+@contextmanager
+def object_mode(cobj, undo=True):
+	"""'OBJECT MODE' (and no global undo if not 'undo') for the block"""
+	mode = cobj.mode
+	edit = bpy.context.preferences.edit
+	global_undo = edit.use_global_undo
+	edit.use_global_undo = global_undo and undo
+	try:
+		if mode != 'OBJECT':
+			with stage("mode"):
+				bpy.ops.object.mode_set(mode='OBJECT')
+		yield mode
+	finally:
+		try:
+			if mode != 'OBJECT' and cobj.mode != mode:
+				with stage("mode"):
+					bpy.ops.object.mode_set(mode=mode)
+		finally:
+			edit.use_global_undo = global_undo
+
+# Every path building the boards (operator, timers, render handlers,
+# heights) counts them first : True if the floor is over the budget and
+# must not be built.
+
+def plancher_refused(params):
+	with stage("count"):
+		over = over_budget(params)                                        # Counted before any board is built
+	if over is None:
+		return False
+	profile_warning("Over the budget : more than %d boards (%d counted)" % (budget["boards"], over[0]))
+	return budget["refuse"]
+
+# The boards, or the proxy, in the mesh of the object (the datablock is
+# kept). No operator : also called by the render handlers.
+
+def plancher_mesh(cobj, params, proxy, unit=None):
+	mesh = cobj.data
+	outline = plancher_outline(cobj)
+	if proxy:
+		with stage("layout"):
+			co, sizes = proxy_layout(params)
+		if outline is not None:
+			with stage("outline"):
+				co, sizes = clip_layout(co, sizes, outline)[:2]
+		with stage("mesh"):
+			update_mesh(mesh, *mesh_buffers(co, sizes))
+	else:
+		with stage("layout"):
+			co, sizes = layout(params, cobj.Plancher.engine, unit)        # From the cache if this floor was already computed
+		boards = np.arange(len(sizes), dtype=np.int32)
+		if outline is not None:                                           # Boards out of the room dropped, the others cut
+			with stage("outline"):
+				co, sizes, boards = clip_layout(co, sizes, outline)
+		loop_verts = None
+		if cobj.Plancher.solid:                                           # Thickness and chamfer in the mesh
+			with stage("solids"):
+				co, loop_verts, sizes, solid_boards = board_solids(co, sizes, cobj.Plancher.height, cobj.Plancher.chamfer)
+				boards = boards[solid_boards]
+		with stage("mesh"):
+			update_mesh(mesh, *mesh_buffers(co, sizes, loop_verts))
+		with stage("attributes"):
+			plancher_attributes(cobj, mesh, boards)
+		with stage("uv"):
+			plancher_uv(cobj, mesh, boards)
+	with stage("modifiers"):
+		plancher_modifiers(cobj, proxy)
+
+#---------------------------------------------------------------------OUTLINE
+# The outline of the room in the space of the floor (XY) : the points of
+# the first spline of a curve (the control points of a Bezier), or the
+# biggest face of a mesh.
+
+def plancher_outline(cobj):
+	room = cobj.Plancher.outline
+	if room is None:
+		return None
+	matrix = cobj.matrix_world.inverted() @ room.matrix_world
+	if room.type == 'CURVE':
+		if not room.data.splines:
+			return None
+		spline = room.data.splines[0]
+		if spline.type == 'BEZIER':
+			points = [p.co for p in spline.bezier_points]
+		else:
+			points = [p.co.xyz for p in spline.points]
+	else:
+		mesh = room.data
+		if not mesh.polygons:
+			return None
+		face = max(mesh.polygons, key=lambda f: f.area)
+		points = [mesh.vertices[i].co for i in face.vertices]
+	if len(points) < 3:
+		return None
+	return np.array([(matrix @ p)[:2] for p in points])
+
+def outline_poll(self, obj):
+	return obj.type in {'CURVE', 'MESH'} and obj != self.id_data
+
+#---------------------------------------------------------------------MODIFIERS
+def plancher_modifiers(cobj, proxy=False):
 	nbop = len(cobj.modifiers)
-	obj = context.active_object
+	obj = cobj
 	if nbop == 0:
 		obj.modifiers.new('Solidify', 'SOLIDIFY')
 		obj.modifiers.new('Bevel', 'BEVEL')
+	solid = cobj.Plancher.solid                                           # The solids don't need the modifiers
 	cobj.modifiers['Solidify'].show_expanded = False
-	cobj.modifiers['Solidify'].thickness = self.height
+	cobj.modifiers['Solidify'].thickness = cobj.Plancher.height
+	cobj.modifiers['Solidify'].show_viewport = not proxy and not solid    # Only at render with the proxy
+	cobj.modifiers['Solidify'].show_render = not solid
 	cobj.modifiers['Bevel'].show_expanded = False
 	cobj.modifiers['Bevel'].width = 0.001
 	cobj.modifiers['Bevel'].use_clamp_overlap
+	cobj.modifiers['Bevel'].show_viewport = not proxy and not solid
+	cobj.modifiers['Bevel'].show_render = not solid
 
-	bpy.context.preferences.edit.use_global_undo = True
+#############################################################
+# LEVEL OF DETAIL
+#############################################################
+# Above 'lod_boards' boards (AUTO) or always (PROXY), the viewport shows
+# a proxy : one face per column, without the modifiers. The boards are
+# built just before a render and the proxy comes back after it. FULL
+# always shows the boards.
+# Whether the mesh is the proxy is a property of the object, so it's
+# still known after the file is saved and opened again. The proxy is
+# decided before the budget : only the boards are counted against it.
+
+def plancher_proxy(cobj, params):
+	"""True if the object must show its proxy"""
+	if cobj.Plancher.lod == 'PROXY':
+		proxy = True
+	elif cobj.Plancher.lod == 'AUTO':
+		with stage("count"):
+			proxy = pattern_count(params, limit=cobj.Plancher.lod_boards)[0] > cobj.Plancher.lod_boards
+	else:
+		proxy = False
+	return proxy
+
+def proxy_objects():
+	for cobj in bpy.data.objects:
+		if cobj.Plancher.proxy and cobj.mode == 'OBJECT':
+			yield cobj
+
+@persistent
+def render_boards(scene, *args):
+	for cobj in proxy_objects():
+		params = plancher_params(cobj)
+		if plancher_refused(params):                                      # Rendered with the proxy
+			print("Plancher : %s over the budget, rendered with its proxy" % cobj.name)
+			continue
+		plancher_mesh(cobj, params, False)
+
+@persistent
+def render_proxy(scene, *args):
+	for cobj in proxy_objects():
+		plancher_mesh(cobj, plancher_params(cobj), True)
+
+#############################################################
+# PREVIEW
+#############################################################
+# While a value is changing (a slider dragged), the floor is rebuilt
+# only for a window of 'preview_columns' columns x 'preview_rows' rows :
+# the boards only, no attributes, no UV, no colors and the modifiers
+# hidden in the viewport. The whole floor is rebuilt when the edits stop
+# (see regenerate()). Only in 'OBJECT MODE', the edit mesh is kept.
+# The window is written in a mesh of its own, the mesh of the floor is
+# kept aside (regen["meshes"]) : it comes back as it was, with its
+# modifiers, before the floor is rebuilt, or if the rebuild is refused
+# (budget) or fails (background job). The windows aren't cached.
+
+def preview_mesh(cobj):
+	"""The mesh of the preview of the object, created the first time"""
+	if cobj.name not in regen["meshes"]:
+		mesh = cobj.data
+		preview = bpy.data.meshes.new(mesh.name + " preview")
+		for material in mesh.materials:
+			preview.materials.append(material)
+		regen["meshes"][cobj.name] = mesh.name
+		cobj.data = preview
+	return cobj.data
+
+def preview_restore(cobj):
+	"""The mesh of the floor back in the object, as before the preview"""
+	name = regen["meshes"].pop(cobj.name, None)
+	mesh = bpy.data.meshes.get(name) if name is not None else None
+	if mesh is None:
+		return
+	preview = cobj.data
+	cobj.data = mesh
+	bpy.data.meshes.remove(preview)
+	plancher_modifiers(cobj, cobj.Plancher.proxy)
+
+def plancher_preview(cobj):
+	if cobj.mode != 'OBJECT' or cobj.Plancher.proxy:                      # The proxy is already light
+		return
+	profile_start(cobj.name, 'PREVIEW')
+	params = preview_params(plancher_params(cobj), *regen["preview"])
+	if plancher_refused(params):                                          # Even the window : a tiny budget
+		mesh = cobj.data
+		plancher_end(mesh)
+		return
+	with stage("layout"):
+		co, sizes = layout(params, cobj.Plancher.engine, cached=False)    # Out of the cache, the window is only shown once
+	mesh = preview_mesh(cobj)
+	with stage("mesh"):
+		update_mesh(mesh, *mesh_buffers(co, sizes))
+	with stage("modifiers"):
+		plancher_modifiers(cobj, True)                                    # Like the proxy : only at render
+	plancher_end(mesh)
+
+#############################################################
+# FAST PATHS
+#############################################################
+# The height and the colors don't change the boards : no new layout,
+# no new mesh, no UV unwrap.
+# The heights are the Z of the unit layout (from the cache) scaled, only
+# the Z column of the mesh is written. If the mesh isn't this floor
+# anymore (edited, new topology) the floor is rebuilt.
+
+def plancher_heights(cobj, context):
+	if cobj.Plancher.proxy:                                               # The proxy is flat, only the thickness at render
+		plancher_modifiers(cobj, True)
+		return
+	if cobj.Plancher.solid or cobj.Plancher.outline:                      # The thickness of the solids, or the faces cut by the outline
+		create_plancher(cobj.Plancher, context)
+		return
+	if not mode_ready(cobj):                                              # In 'EDIT MODE' but not active : later
+		defer(cobj, 'HEIGHT')
+		return
+	profile_start(cobj.name, 'HEIGHT')
+	params = plancher_params(cobj)
+	if plancher_refused(params):                                          # The mesh is kept as it is
+		mesh = cobj.data
+		plancher_end(mesh)
+		return
+	with stage("layout"):
+		co, sizes = unit_layout(params, cobj.Plancher.engine)
+	with object_mode(cobj):
+		with stage("mesh"):
+			done = update_heights(cobj.data, heights(co, params), sizes)
+		if done:
+			with stage("modifiers"):
+				plancher_modifiers(cobj)
+	if not done:
+		profile_warning("The mesh isn't this floor anymore : rebuilt")
+		plancher_end(cobj.data)                                           # The HEIGHT run ends here, the rebuild is a new run
+		create_plancher(cobj.Plancher, context)
+		return
+	mesh = cobj.data
+	plancher_end(mesh)
+
+# The board attributes and the UV (random offset) are always written,
+# the colors only in 'EDIT MODE', like create_plancher()
+
+def plancher_recolor(cobj, context):
+	if cobj.Plancher.proxy:                                               # Nothing to color on the proxy
+		return
+	if not mode_ready(cobj):                                              # In 'EDIT MODE' but not active : later
+		defer(cobj, 'COLOR')
+		return
+	profile_start(cobj.name, 'COLOR')
+	mesh = cobj.data
+	with object_mode(cobj) as obj_mode:
+		with stage("attributes"):
+			plancher_attributes(cobj, mesh)
+		with stage("uv"):
+			plancher_uv(cobj, mesh)
+		if obj_mode == 'EDIT':
+			plancher_colors(cobj, mesh)
+	plancher_end(mesh)
+
+#############################################################
+# REGENERATION
+#############################################################
+# The properties don't rebuild the floor directly : they mark the object
+# as dirty and a timer rebuilds it once no edit came for 'regen_delay'.
+# So dragging a slider, or the setters (lock_length, nbr_length...) that
+# change other properties, cost only one rebuild. Each edit pushes the
+# rebuild back, the rebuilds of the intermediate values are dropped.
+# Each object keeps what has to be done : the whole floor (GEOMETRY),
+# or only the heights (HEIGHT) and / or the colors (COLOR).
+# While the edits go on, the timer shows a preview of the floors with a
+# new GEOMETRY (if 'preview' isn't None : (columns, rows)).
+
+regen_delay = 0.15                                                        # Seconds without edit before the rebuild
+regen = {"edit": 0.0, "dirty": {}, "background": True, "preview": (50, 50), "meshes": {}}
+
+def schedule(self, stage):
+	regen["edit"] = time.monotonic()
+	regen["dirty"].setdefault(self.id_data.name, set()).add(stage)
+	if not bpy.app.timers.is_registered(regenerate):
+		bpy.app.timers.register(regenerate, first_interval=regen_delay)
+
+def schedule_plancher(self, context):
+	schedule(self, 'GEOMETRY')
+
+def schedule_heights(self, context):
+	schedule(self, 'HEIGHT')
+
+def schedule_colors(self, context):
+	schedule(self, 'COLOR')
+
+def regenerate():
+	wait = regen["edit"] + regen_delay - time.monotonic()
+	if wait > 0:                                                          # A newer edit came, wait again
+		if regen["preview"] is not None:
+			for name, stages in regen["dirty"].items():
+				cobj = bpy.data.objects.get(name)
+				if cobj is not None and 'GEOMETRY' in stages:
+					plancher_preview(cobj)
+		return wait
+	dirty = regen["dirty"]
+	regen["dirty"] = {}
+	for name, stages in dirty.items():
+		cobj = bpy.data.objects.get(name)
+		if cobj is None:                                                  # The object may have been deleted
+			continue
+		try:                                                              # An error doesn't stop the other objects
+			if 'GEOMETRY' in stages:                                      # Also new heights and colors
+				create_plancher(cobj.Plancher, bpy.context, regen["background"])
+				continue
+			if name in jobs["running"]:                                   # The new heights and colors are read when the job is applied
+				continue
+			if 'HEIGHT' in stages:
+				plancher_heights(cobj, bpy.context)
+			if 'COLOR' in stages:
+				plancher_recolor(cobj, bpy.context)
+		except Exception as error:
+			print("Plancher : %s not rebuilt : %r" % (name, error))
+	return regen_delay if regen["dirty"] else None                        # The deferred runs
+
+#############################################################
+# BACKGROUND JOBS
+#############################################################
+# With 'background' on, a rebuild from the timer above whose layout isn't
+# in the cache computes it in a thread (core.job_submit()) and returns.
+# apply_layouts() polls the jobs and writes the finished layouts in the
+# meshes on the main thread. A newer edit submits a newer job, which
+# cancels the old one : only the last generation of an object comes
+# back. A layout is also dropped if the object doesn't have its boards
+# anymore (deleted, or rebuilt with other parameters) ; the height and
+# the colors aren't part of the layout, they are read when it's applied.
+# An object in 'EDIT MODE' that isn't active gets its layout from the
+# cache later (defer()) ; a layout that can't be written is reported and
+# the others are still applied.
+
+jobs_interval = 0.05                                                      # Seconds between two polls of the jobs
+
+def apply_layouts():
+	for name, generation, params, future in job_results():
+		cobj = bpy.data.objects.get(name)
+		if cobj is None or future.cancelled():
+			continue
+		if unit_params(plancher_params(cobj)) != unit_params(params):     # Other boards since the job was submitted
+			continue
+		error = future.exception()
+		if error is not None:
+			print("Plancher : no layout for %s (job %d) : %r" % (name, generation, error))
+			preview_restore(cobj)                                         # The floor as it was, not the window
+			continue
+		if not mode_ready(cobj):                                          # The layout is in the cache : written later
+			defer(cobj, 'GEOMETRY')
+			continue
+		try:                                                              # An error doesn't stop the other layouts
+			create_plancher(cobj.Plancher, bpy.context, unit=future.result())
+		except Exception as error:
+			print("Plancher : layout of %s (job %d) not written : %r" % (name, generation, error))
+			preview_restore(cobj)
+	return jobs_interval if jobs["running"] else None
 
 # -------------------------------------------------------------------- #
 ## Properties
 class Plancher_prop(bpy.types.PropertyGroup):
 #---List of environment options
 	floor_type : EnumProperty(name="Type",
-								description="Type:\n"+
-								"\u2022 Sky texture: Use the internal sky texture for background\n"+
-								"\u2022 Image texture: Use HDRI for background\n"+
-								"Selected",
-								items = {
-										("Herringbone", "Herringbone", "Herringbone", 0),
-										("Tiles", "Tiles", "Tiles", 1),
-										("Squares", "Squares", "Squares", 2),
-										("Chevron", "Chevron", "Chevron", 3),
-										("Ladder", "Ladder", "Ladder", 4),
-										("Fougere", "Fougere", "Fougere", 5),
-										("Stack Bond", "Stack Bond", "Stack Bond", 6),
-										},
+								description="Pattern of the boards",
+								items = [(name, name, pattern["description"], pattern["index"]) for name, pattern in patterns.items()],
 								default = "Stack Bond",
 								update=update_type,
 								)
 
+#---Engine used to compute the boards
+	engine : EnumProperty(name="Engine",
+								description="Engine used to compute the boards",
+								items = (
+										("NUMPY", "NumPy", "Compute a whole column of boards at once", 0),
+										("LOOP", "Loop", "Compute the boards one by one", 1),
+										("PARALLEL", "Parallel", "Compute the groups of columns in several processes (huge floors)", 2),
+										),
+								default = "NUMPY",
+								update=schedule_plancher,
+								)
+
+#---Outline of the room
+	outline : PointerProperty(name="Room",
+			   description="Curve or mesh (its biggest face) : the boards out of it are removed, the boards on its edges are cut",
+			   type=bpy.types.Object,
+			   poll=outline_poll,
+			   update=schedule_plancher)
+
+#---Thickness and chamfer in the mesh
+	solid : BoolProperty(
+			   name="Baked solid",
+			   description="Build the thickness and the chamfer of the boards in the mesh, without the Solidify and Bevel modifiers",
+			   default=False,
+			   update=schedule_plancher)
+
+#---Chamfer of the baked solids
+	chamfer : FloatProperty(
+			   name="Chamfer",
+			   description="Chamfer of the top edges of the boards",
+			   min=0.0, max=0.1,
+			   default=0.001,
+			   precision=4,
+			   subtype='DISTANCE',
+			   update=schedule_plancher)
+
+#---Level of detail in the viewport
+	lod : EnumProperty(name="Viewport",
+								description="Boards or proxy in the viewport, the boards are always rendered",
+								items = (
+										("AUTO", "Auto", "Proxy above a number of boards", 0),
+										("FULL", "Boards", "Always show the boards", 1),
+										("PROXY", "Proxy", "Always show the proxy : one face per column, no modifiers", 2),
+										),
+								default = "AUTO",
+								update=schedule_plancher,
+								)
+
+#---Number of boards above which the proxy is shown
+	lod_boards : IntProperty(
+			name="Boards",
+			description="Number of boards above which the viewport shows the proxy",
+			min=1, max=2**31 - 1,
+			default=100000,
+			update=schedule_plancher)
+
+#---The mesh is the proxy (set by each rebuild, kept in the file)
+	proxy : BoolProperty(
+			name="Proxy",
+			description="The mesh is the proxy of the floor",
+			default=False,
+			options={'HIDDEN'})
+
 #---Switch between length of the board and meters
 	lock_length : BoolProperty(
 			   name="Lock length",
@@ -1034,7 +1027,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   default=False,
 			   get=get_lock_length,
 			   set=set_lock_length,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Length of the floor
 	floor_length : FloatProperty(
@@ -1044,7 +1037,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   default=4.0,
 			   precision=2,
 			   subtype='DISTANCE',
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Number of column
 	nbr_length : IntProperty(
@@ -1054,7 +1047,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			default=1,
 			get=get_nbr_length,
 			set=set_nbr_length,
-			update=create_plancher)
+			update=schedule_plancher)
 
 #---Number of row
 	nbrboards : IntProperty(
@@ -1062,7 +1055,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			description="Number of rows",
 			min=1, max=100,
 			default=2,
-			update=create_plancher)
+			update=schedule_plancher)
 
 #---Length of a board after tilt
 	length_y : FloatProperty(
@@ -1082,7 +1075,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   default=2.0,
 			   precision=2,
 			   subtype='DISTANCE',
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Height of the floor
 	height : FloatProperty(
@@ -1092,7 +1085,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=0.01,
 			  precision=2,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_heights)
 
 #---Add random to the height
 	randheight : FloatProperty(
@@ -1104,7 +1097,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   subtype='PERCENTAGE',
 			   unit='NONE',
 			   step=0.1,
-			   update=create_plancher)
+			   update=schedule_heights)
 #---Width of a board
 	width : FloatProperty(
 			  name="Width",
@@ -1113,7 +1106,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=0.18,
 			  precision=3,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_plancher)
 
 #---Add random to the width
 	randwith : FloatProperty(
@@ -1125,7 +1118,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   subtype='PERCENTAGE',
 			   unit='NONE',
 			   step=0.1,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Add a gap between the columns (X)
 	gapx : FloatProperty(
@@ -1135,7 +1128,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=0.01,
 			  precision=2,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_plancher)
 
 #---Add a gap between the row (Y) (for the transversal's boards)
 	gapy : FloatProperty(
@@ -1145,7 +1138,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=0.01,
 			  precision=2,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_plancher)
 
 #---Shift the columns
 	shifty : FloatProperty(
@@ -1155,7 +1148,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   default=0,
 			   precision=2,
 			   step=0.1,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Add random to the shift
 	randoshifty : FloatProperty(
@@ -1167,7 +1160,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   subtype='PERCENTAGE',
 			   unit='NONE',
 			   step=0.1,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Number of column to shift
 	nbrshift : IntProperty(
@@ -1175,21 +1168,21 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			description="Number of column to shift",
 			min=1, max=100,
 			default=1,
-			update=create_plancher)
+			update=schedule_plancher)
 
 #---Fill in the gap between the row (transversal)
 	fill_gap_y : BoolProperty(
 			   name=" ",
 			   description="Fill in the gap between the row",
 			   default=False,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Unlock the length of the transversal
 	locktrans : BoolProperty(
 			   name="Unlock",
 			   description="Unlock the length of the transversal",
 			   default=False,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Length of the transversal
 	lengthtrans : FloatProperty(
@@ -1199,7 +1192,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=2,
 			  precision=2,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_plancher)
 
 #---Number of transversals in the interval
 	nbrtrans : IntProperty(
@@ -1207,7 +1200,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			description="Number of transversals in the interval",
 			min=1, max=100,
 			default=1,
-			update=create_plancher)
+			update=schedule_plancher)
 
 #---Gap between the transversals
 	gaptrans : FloatProperty(
@@ -1217,7 +1210,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			  default=0.01,
 			  precision=2,
 			  subtype='DISTANCE',
-			  update=create_plancher)
+			  update=schedule_plancher)
 
 #---Add random to the width
 	randgaptrans : FloatProperty(
@@ -1229,21 +1222,21 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   subtype='PERCENTAGE',
 			   unit='NONE',
 			   step=0.1,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Glue the boards in the shift parameter
 	glue : BoolProperty(
 			   name="glue",
 			   description="Glue the boards in the shift parameter",
 			   default=False,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Add borders
 	borders : BoolProperty(
 			   name="Borders",
 			   description="Add borders between the glued boards",
 			   default=False,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
 #---Tilt the columns
 	tilt : FloatProperty(
@@ -1255,16 +1248,15 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   subtype='ANGLE',
 			   unit='ROTATION',
 			   step=1,
-			   update=create_plancher)
+			   update=schedule_plancher)
 
-#---Floor type Herringbone
+#---Floor type Herringbone (floor_type)
 	herringbone : BoolProperty(
 			   name="Herringbone",
 			   description="Floor type Herringbone",
 			   default=False,
 			   get=get_herringbone,
-			   set=set_herringbone,
-			   update=create_plancher)
+			   set=set_herringbone)                                       # floor_type schedules the rebuild
 
 #---Random color to the vertex group
 	colrand : IntProperty(
@@ -1272,7 +1264,7 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   description="Random color to the vertex group",
 			   min=0, max=100,
 			   default=0,
-			   update=create_plancher)
+			   update=schedule_colors)
 
 #---Orderly color to the vertex group
 	colphase : IntProperty(
@@ -1280,7 +1272,15 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   description="Orderly color to the vertex group",
 			   min=0, max=100,
 			   default=0,
-			   update=create_plancher)
+			   update=schedule_colors)
+
+#---New distribution for the random of the boards
+	randseed : IntProperty(
+			   name="Seed Boards",
+			   description="New distribution for the random of the boards (width, shift, height, gaps)",
+			   min=0, max=999999,
+			   default=0,
+			   update=schedule_plancher)
 
 #---New distribution for the random
 	colseed : IntProperty(
@@ -1288,14 +1288,140 @@ class Plancher_prop(bpy.types.PropertyGroup):
 			   description="New distribution for the random",
 			   min=0, max=999999,
 			   default=0,
-			   update=create_plancher)
+			   update=schedule_colors)
 
 #---Random color for each board
 	allrandom : BoolProperty(
 			   name="allrandom",
 			   description="Make a random color for each board",
 			   default=False,
-			   update=create_plancher)
+			   update=schedule_colors)
+
+#---Random offset of the UV of each board
+	uvoffset : FloatProperty(
+			   name="UV Offset",
+			   description="Random offset of the UV of each board, in the texture",
+			   min=0.0, max=100.0,
+			   default=0.0,
+			   precision=2,
+			   update=schedule_colors)
+
+#---Vertex group for each color
+	colgroups : BoolProperty(
+			   name="Vertex Groups",
+			   description="Make a vertex group for each color (heavy on big floors, the attributes board_id / board_rand are lighter)",
+			   default=False,
+			   update=schedule_colors)
+
+#############################################################
+# PREFERENCES
+#############################################################
+def update_cache_limit(self, context):
+	cache_limit(self.cache_limit * 2**20)
+
+def update_profile_memory(self, context):
+	profile["tracemalloc"] = self.profile_memory
+
+def update_budget(self, context):
+	budget["boards"] = self.budget_boards
+	budget["refuse"] = self.budget_refuse
+
+def update_background(self, context):
+	regen["background"] = self.background
+
+def update_preview(self, context):
+	regen["preview"] = (self.preview_columns, self.preview_rows) if self.preview else None
+
+class PLANCHER_AP_Preferences(bpy.types.AddonPreferences):
+	bl_idname = __package__
+
+#---Memory limit of the layout cache
+	cache_limit : IntProperty(
+			name="Cache (MB)",
+			description="Memory limit of the cache of the last computed floors",
+			min=0, max=65536,
+			default=256,
+			update=update_cache_limit)
+
+#---Memory peak of the updates
+	profile_memory : BoolProperty(
+			name="Trace memory",
+			description="Record the memory peak of each update of a floor (tracemalloc, slower)",
+			default=False,
+			update=update_profile_memory)
+
+#---Biggest floor, in boards
+	budget_boards : IntProperty(
+			name="Budget (boards)",
+			description="Biggest floor, in boards (0 : no limit). Counted before the boards are built",
+			min=0, max=2**31 - 1,
+			default=1000000,
+			update=update_budget)
+
+#---Refuse or only warn over the budget
+	budget_refuse : BoolProperty(
+			name="Refuse",
+			description="Don't build a floor over the budget, else only warn",
+			default=True,
+			update=update_budget)
+
+#---Layouts computed in a thread
+	background : BoolProperty(
+			name="Background",
+			description="Compute the new floors in the background, the interface isn't blocked",
+			default=True,
+			update=update_background)
+
+#---Window of the floor while a value is changing
+	preview : BoolProperty(
+			name="Preview",
+			description="Show only a window of the floor, without colors and modifiers, while a value is changing",
+			default=True,
+			update=update_preview)
+
+	preview_columns : IntProperty(
+			name="Columns",
+			description="Number of columns of the preview",
+			min=1, max=10000,
+			default=50,
+			update=update_preview)
+
+	preview_rows : IntProperty(
+			name="Rows",
+			description="Number of boards along the length of the preview",
+			min=1, max=10000,
+			default=50,
+			update=update_preview)
+
+	def draw(self, context):
+		layout = self.layout
+		stats = cache_stats()
+		row = layout.row()
+		row.prop(self, "cache_limit")
+		row.operator("plancher.clear_cache")
+		row = layout.row()
+		row.prop(self, "budget_boards")
+		row.prop(self, "budget_refuse")
+		row = layout.row()
+		row.prop(self, "preview")
+		sub = row.row()
+		sub.enabled = self.preview
+		sub.prop(self, "preview_columns")
+		sub.prop(self, "preview_rows")
+		row = layout.row()
+		row.prop(self, "background")
+		row.prop(self, "profile_memory")
+		layout.label(text="%d floors, %d chunks, %.1f MB - %d hits, %d misses, %d removed" % (stats["entries"], stats["chunks"], stats["size"] / 2**20, stats["hits"], stats["misses"], stats["evictions"]))
+		layout.label(text="Chunks : %d hits, %d misses" % (stats["chunk_hits"], stats["chunk_misses"]))
+
+class PLANCHER_OT_ClearCache(bpy.types.Operator):
+	bl_idname = "plancher.clear_cache"
+	bl_label = "Clear"
+	bl_description = "Clear the cache of the computed floors"
+
+	def execute(self, context):
+		cache_clear()
+		return {'FINISHED'}
 
 class PLANCHER_OT_AddObject(bpy.types.Operator):
 	bl_idname = "plancher.add_object"
@@ -1316,6 +1442,8 @@ class PLANCHER_OT_AddObject(bpy.types.Operator):
 classes = (
 	MAIN_PT_Plancher,
 	PLANCHER_OT_AddObject,
+	PLANCHER_OT_ClearCache,
+	PLANCHER_AP_Preferences,
 	Plancher_prop,
 	)
 
@@ -1324,9 +1452,38 @@ def register():
 	for cls in classes:
 		register_class(cls)
 	bpy.types.Object.Plancher = bpy.props.PointerProperty(type=Plancher_prop)
+	if hasattr(bpy.app, "binary_path_python"):                            # Python used by the processes of the parallel engine
+		pool["executable"] = bpy.app.binary_path_python
+	addon = bpy.context.preferences.addons.get(__package__)
+	if addon is not None:                                                 # Not there yet the first time the add-on is enabled
+		update_cache_limit(addon.preferences, bpy.context)
+		update_profile_memory(addon.preferences, bpy.context)
+		update_budget(addon.preferences, bpy.context)
+		update_background(addon.preferences, bpy.context)
+		update_preview(addon.preferences, bpy.context)
+	bpy.app.handlers.render_init.append(render_boards)
+	bpy.app.handlers.render_complete.append(render_proxy)
+	bpy.app.handlers.render_cancel.append(render_proxy)
+	bpy.app.handlers.load_post.append(migrate_objects)
+	bpy.app.timers.register(migrate_objects, first_interval=0)            # The file already open (bpy.data is restricted here)
 
 def unregister():
 	from bpy.utils import unregister_class
+	if bpy.app.timers.is_registered(regenerate):
+		bpy.app.timers.unregister(regenerate)
+	if bpy.app.timers.is_registered(apply_layouts):
+		bpy.app.timers.unregister(apply_layouts)
+	for name in list(regen["meshes"]):                                    # No rebuild will come : the floors as they were
+		cobj = bpy.data.objects.get(name)
+		if cobj is not None:
+			preview_restore(cobj)
+	job_shutdown()
+	pool_shutdown()
+	if bpy.app.timers.is_registered(migrate_objects):
+		bpy.app.timers.unregister(migrate_objects)
+	for handlers, handler in ((bpy.app.handlers.render_init, render_boards), (bpy.app.handlers.render_complete, render_proxy), (bpy.app.handlers.render_cancel, render_proxy), (bpy.app.handlers.load_post, migrate_objects)):
+		if handler in handlers:
+			handlers.remove(handler)
 	for cls in reversed(classes):
 		unregister_class(cls)
 	del bpy.types.Object.Plancher
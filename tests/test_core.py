@@ -0,0 +1,336 @@
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+#############################################################
+# TESTS OF THE CORE
+#############################################################
+# The loop engine (parquet()) is the reference : the NumPy engines must
+# give the same floor, vertex for vertex. core.py doesn't need Blender,
+# it's loaded from the folder above (python -m pytest tests).
+
+import importlib.util
+import os
+import random
+
+import numpy as np
+import pytest
+
+def load_core():
+	path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core.py")
+	spec = importlib.util.spec_from_file_location("plancher_core", path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+core = load_core()
+
+BASE = dict(lock_length=False, nbrboards=8, nbr_length=10, height=0.01, randheight=0.5, width=0.2, randwith=0.0,
+			gapx=0.002, lengthboard=2.0, gapy=0.002, shifty=0.0, nbrshift=3, tilt=0.0, herringbone=False, randoshifty=0.0,
+			floor_length=12.0, fill_gap_y=False, gaptrans=0.001, randgaptrans=0.0, glue=False, borders=False,
+			lengthtrans=0.5, locktrans=False, nbrtrans=1, seed=3)
+
+FLOORS = {
+	"stack bond": dict(),
+	"shift": dict(shifty=0.4, randoshifty=0.3, randwith=0.3),
+	"transversals": dict(fill_gap_y=True, nbrtrans=2),
+	"unlock": dict(fill_gap_y=True, locktrans=True, lengthtrans=0.7),
+	"borders": dict(fill_gap_y=True, glue=True, borders=True, gapx=0.01),
+	"chevron": dict(tilt=0.4),
+	"herringbone": dict(herringbone=True, lengthboard=0.6, width=0.1),
+	"lock length": dict(lock_length=True, nbr_length=7, lengthboard=0.9),
+	}
+
+def params(floor):
+	return tuple(dict(BASE, **FLOORS[floor]).values())
+
+#############################################################
+# ROWS
+#############################################################
+# rowstarts() must do the additions of the loop ('start2 += translatey
+# + gapy'), in the same order.
+
+def loop_rowstarts(start, step, floor_length):
+	ys = [start]
+	while ys[-1] < floor_length:
+		ys.append(ys[-1] + step)
+	return ys
+
+def test_rowstarts_loop():
+	rnd = random.Random(1)
+	for i in range(2000):
+		start = rnd.uniform(0, 3)
+		step = rnd.choice([0.1, 0.2, 2.002, rnd.uniform(0.01, 3)])
+		floor_length = rnd.choice([rnd.uniform(0, 60), start + step * rnd.randint(0, 40)])
+		ys = core.rowstarts(start, step, floor_length)
+		assert ys.tolist() == loop_rowstarts(start, step, floor_length)
+		assert core.rowcount(start, step, floor_length) == len(ys)
+
+#############################################################
+# ENGINES
+#############################################################
+
+@pytest.mark.parametrize("floor", FLOORS)
+def test_numpy_loop(floor):
+	co, sizes = core.parquet_array(*params(floor))
+	loop_co, loop_sizes = core.pydata_to_array(*core.parquet(*params(floor)))
+	assert np.array_equal(sizes, loop_sizes)
+	assert np.array_equal(co, loop_co)
+
+@pytest.mark.parametrize("floor", FLOORS)
+def test_tiled_chunked(floor):
+	co, sizes = core.parquet_array(*params(floor))
+	tiled = core.parquet_tiled(*params(floor))
+	if tiled is not None:                                                 # Only the periodic floors
+		assert np.array_equal(tiled[0], co) and np.array_equal(tiled[1], sizes)
+	core.cache_clear()
+	chunked = core.parquet_chunked(*params(floor))
+	assert np.array_equal(chunked[0], co) and np.array_equal(chunked[1], sizes)
+
+@pytest.mark.parametrize("floor", FLOORS)
+def test_count(floor):
+	co, sizes = core.parquet_array(*params(floor))
+	assert core.parquet_count(*params(floor)) == (len(sizes), len(co))
+
+#############################################################
+# STREAM
+#############################################################
+# The chunks of parquet_stream() and the buffers of parquet_into() are
+# the floor of its pattern, for every pattern.
+
+@pytest.mark.parametrize("pattern", list(core.patterns))
+@pytest.mark.parametrize("floor", FLOORS)
+def test_stream(floor, pattern):
+	floor_params = params(floor) + (pattern,)
+	co, sizes = core.pattern_array(floor_params)
+	chunks = list(core.parquet_stream(floor_params, chunk=37))
+	assert all(len(chunk_sizes) >= 37 for chunk_co, chunk_sizes in chunks[:-1])
+	assert np.array_equal(np.concatenate([chunk_co for chunk_co, chunk_sizes in chunks]), co)
+	assert np.array_equal(np.concatenate([chunk_sizes for chunk_co, chunk_sizes in chunks]), sizes)
+	into_co = np.empty_like(co)
+	into_sizes = np.empty_like(sizes)
+	assert core.parquet_into(into_co, into_sizes, floor_params, chunk=37) == (len(co), len(sizes))
+	assert np.array_equal(into_co, co) and np.array_equal(into_sizes, sizes)
+
+#############################################################
+# OUTLINE
+#############################################################
+# The pieces of each board cut by the outline cover the part of the
+# board in the room : the same area as the outline clipped by the board
+# (convex, Sutherland-Hodgman), for random star-shaped rooms.
+
+def convex_clip(subject, convex):
+	"""Part of the polygon 'subject' in the convex polygon 'convex' (counterclockwise)"""
+	for a, b in zip(convex, np.roll(convex, -1, axis=0)):
+		side = lambda p: (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])
+		points = []
+		for p, q in zip(subject, np.roll(subject, -1, axis=0)):
+			sp, sq = side(p), side(q)
+			if sp >= 0:
+				points.append(p)
+			if (sp >= 0) != (sq >= 0):
+				points.append(p + (q - p) * sp / (sp - sq))
+		subject = np.array(points)
+		if not len(subject):
+			break
+	return subject
+
+def star_outline(rng):
+	n = rng.integers(3, 20)
+	angles = np.sort(rng.random(n)) * 2 * np.pi
+	radius = rng.uniform(0.5, 3.0, n)
+	return np.stack((radius * np.cos(angles), radius * np.sin(angles)), axis=1) + (1.0, 2.5)
+
+@pytest.mark.parametrize("floor", ["stack bond", "shift", "chevron", "herringbone"])
+def test_clip_area(floor):
+	co, sizes = core.parquet_array(*params(floor))
+	starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+	rng = np.random.default_rng(7)
+	for i in range(10):
+		outline = star_outline(rng)
+		clip_co, clip_sizes, boards = core.clip_layout(co, sizes, outline)
+		assert np.isin(clip_co[:, 2], co[:, 2]).all()                     # The Z of the boards
+		clip_starts = np.concatenate(([0], np.cumsum(clip_sizes)[:-1])).astype(int)
+		areas = np.zeros(len(sizes))
+		for start, size, board in zip(clip_starts, clip_sizes, boards):
+			areas[board] += abs(core.polygon_area(clip_co[start:start + size, :2]))
+		for board, (start, size) in enumerate(zip(starts, sizes)):
+			corners = co[start:start + size, :2].astype(np.float64)
+			if core.polygon_area(corners) < 0:
+				corners = corners[::-1]
+			inside = convex_clip(outline, corners)
+			expected = abs(core.polygon_area(inside)) if len(inside) > 2 else 0.0
+			assert areas[board] == pytest.approx(expected, abs=1e-5)
+
+#############################################################
+# SOLIDS
+#############################################################
+# Each board is a closed solid : every edge is used by two faces, once
+# in each direction, and the faces turned outwards give a positive
+# volume, close to the one of the board (area * thickness).
+
+@pytest.mark.parametrize("chamfer", [0.0, 0.002, 1.0])
+@pytest.mark.parametrize("floor", ["stack bond", "chevron", "herringbone", "borders"])
+def test_solids_closed(floor, chamfer):
+	co, sizes = core.parquet_array(*params(floor))
+	thickness = 0.02
+	solid_co, loop_verts, loop_totals, face_boards = core.board_solids(co, sizes, thickness, chamfer)
+	solid_co = np.asarray(solid_co, dtype=np.float64).reshape(-1, 3)
+	loop_starts = np.concatenate(([0], np.cumsum(loop_totals)[:-1]))
+	following = core.next_loops(loop_starts, len(loop_verts))
+	edges = np.stack((loop_verts, loop_verts[following]), axis=1).astype(np.int64)
+	keys = edges[:, 0] * len(solid_co) + edges[:, 1]
+	reverse = edges[:, 1] * len(solid_co) + edges[:, 0]
+	assert len(np.unique(keys)) == len(keys)                              # Each edge once in each direction
+	assert np.isin(reverse, keys).all()
+
+	loop_faces = np.repeat(np.arange(len(loop_totals)), loop_totals)
+	p0 = solid_co[loop_verts[loop_starts]][loop_faces]                    # Fan of each face
+	p1 = solid_co[loop_verts]
+	p2 = solid_co[loop_verts[following]]
+	volumes = np.zeros(len(sizes))
+	np.add.at(volumes, face_boards[loop_faces], (p0 * np.cross(p1, p2)).sum(axis=1) / 6)
+	starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+	areas = np.array([abs(core.polygon_area(co[start:start + size, :2])) for start, size in zip(starts, sizes)])
+	assert (volumes > 0).all()
+	assert (volumes <= areas * thickness * (1 + 1e-4)).all()
+	if chamfer == 0:
+		assert volumes == pytest.approx(areas * thickness, rel=1e-4)
+
+#############################################################
+# CACHE
+#############################################################
+
+def test_cache_hits():
+	core.cache_clear()
+	floor_params = params("shift") + ("Stack Bond",)
+	before = core.cache_stats()
+	co, sizes = core.unit_layout(floor_params, "LOOP")                    # Kept whole
+	stats = core.cache_stats()
+	assert stats["misses"] == before["misses"] + 1 and stats["entries"] == 1
+	assert core.layout_cached(floor_params)
+	again = core.unit_layout(floor_params, "LOOP")
+	assert again[0] is co and again[1] is sizes
+	assert core.cache_stats()["hits"] == stats["hits"] + 1
+	assert not co.flags.writeable
+
+	core.cache_clear()
+	chunked = core.unit_layout(floor_params, "NUMPY")                     # Kept as chunks, not whole
+	stats = core.cache_stats()
+	assert stats["entries"] == 0 and stats["chunks"] > 0
+	assert stats["chunk_misses"] - before["chunk_misses"] == stats["chunks"]
+	assert core.layout_cached(floor_params)
+	again = core.unit_layout(floor_params, "NUMPY")
+	assert np.array_equal(again[0], chunked[0]) and np.array_equal(again[0], co)
+	assert core.cache_stats()["chunk_hits"] == stats["chunk_hits"] + stats["chunks"]
+	assert core.cache_stats()["size"] == stats["size"]                    # Not stored twice
+	core.cache_clear()
+
+def test_cache_evictions():
+	core.cache_clear()
+	limit = core.cache["limit"]
+	entry = lambda: (np.zeros((10, 3), dtype=np.float32), np.zeros(10, dtype=np.int32))
+	nbytes = sum(array.nbytes for array in entry())
+	try:
+		core.cache_limit(2 * nbytes)
+		evictions = core.cache_stats()["evictions"]
+		core.cache_put(("a",), *entry())
+		core.cache_put(("b",), *entry())
+		core.cache_put(("a",), *entry())                                  # Put again : replaced, not counted twice
+		assert core.cache_stats()["size"] == 2 * nbytes
+		assert core.cache_get(("b",)) is not None                         # "a" is now the least recently used
+		core.cache_put(("c",), *entry())
+		assert core.cache_get(("a",)) is None
+		assert core.cache_get(("b",)) is not None and core.cache_get(("c",)) is not None
+		assert core.cache_stats()["evictions"] == evictions + 1
+		core.cache_put(("big",), np.zeros((100, 3), dtype=np.float32), np.zeros(100, dtype=np.int32))
+		assert core.cache_get(("big",)) is None                           # Bigger than the limit : not kept
+		core.cache_limit(nbytes)
+		assert core.cache_stats()["entries"] == 1 and core.cache_stats()["evictions"] == evictions + 2
+	finally:
+		core.cache_limit(limit)
+		core.cache_clear()
+
+#############################################################
+# COLORS AND UV
+#############################################################
+
+def test_board_colors():
+	colors, groups = core.board_colors(100, 4, 10, 0, False)
+	assert colors.shape == (100, 4) and (colors[:, 3] == 1).all()
+	assert groups.min() >= 0 and groups.max() < 10
+	assert len(np.unique(colors, axis=0)) <= 10
+	assert np.array_equal(colors[groups == groups[0]], np.repeat(colors[:1], (groups == groups[0]).sum(), axis=0))
+	colors, groups = core.board_colors(9, 4, 0, 3, False)
+	assert groups.tolist() == [2, 1, 0] * 3
+	assert np.array_equal(core.board_colors(50, 4, 0, 0, False)[0], core.board_colors(50, 4, 0, 0, False)[0])
+
+def test_board_uvs():
+	co, sizes = core.parquet_array(*params("stack bond"))
+	starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+	uv = core.board_uvs(co, starts, 4, 0.0)
+	loop_faces = np.repeat(np.arange(len(sizes)), sizes)
+	spans = np.array([np.ptp(uv[loop_faces == face], axis=0) for face in range(len(sizes))])
+	assert np.allclose(np.minimum.reduceat(uv, starts), 0, atol=1e-6)     # Each board at the origin of the texture
+	assert np.allclose(spans[:, 0], BASE["width"], atol=1e-5)             # V along the length (cut at the end of the floor)
+	assert (spans[:, 1] > BASE["width"]).all() and (spans[:, 1] <= BASE["lengthboard"] + 1e-5).all()
+
+	# The faces of a solid and the pieces of a cut board share the frame and the offset of their board
+	outline = np.array([[-1, -1], [2, -1], [2, 13], [-1, 13], [-1, 0.7], [1.0, 0.7], [1.0, 0.5], [-1, 0.5]])
+	clip_co, clip_sizes, boards = core.clip_layout(co, sizes, outline)
+	solid_co, loop_verts, loop_totals, face_boards = core.board_solids(clip_co, clip_sizes, 0.02, 0.002)
+	solid_co = np.asarray(solid_co).reshape(-1, 3)
+	solid_starts = np.concatenate(([0], np.cumsum(loop_totals)[:-1]))
+	solid_boards = boards[face_boards]
+	uv = core.board_uvs(solid_co[loop_verts], solid_starts, 4, 0.5, solid_boards)
+	full = core.board_uvs(co, starts, 4, 0.5)
+	solid_faces = np.repeat(np.arange(len(loop_totals)), loop_totals)
+	assert (np.array([np.ptp(uv[solid_faces == face], axis=0).min() for face in range(len(loop_totals))]) > 1e-4).all()
+	top = solid_co[loop_verts][:, 2] == solid_co[:, 2][loop_verts].max()  # Stack bond : U = X, V = Y
+	for board in np.unique(solid_boards[np.bincount(boards, minlength=len(sizes))[solid_boards] > 1]):
+		loops = np.isin(solid_faces, np.where(solid_boards == board)[0])
+		shift = uv[loops] - solid_co[loop_verts][loops][:, :2]
+		flat = full[loop_faces == board] - co[loop_faces == board][:, :2]
+		assert np.allclose(shift[top[loops]], flat[0], atol=1e-5)
+
+#############################################################
+# BACKGROUND
+#############################################################
+# A new job of the same object cancels the one in flight : only the last
+# generation comes back.
+
+def test_job_generations():
+	core.cache_clear()
+	floor_params = params("shift") + ("Stack Bond",)
+	other = params("chevron") + ("Chevron",)
+	try:
+		first = core.job_submit("floor", floor_params)
+		job = core.jobs["running"]["floor"]
+		second = core.job_submit("floor", other)
+		assert second == first + 1
+		assert job["cancel"].is_set()
+		core.jobs["running"]["floor"]["future"].result(timeout=60)
+		results = list(core.job_results())
+		assert [(name, generation, job_params) for name, generation, job_params, future in results] == [("floor", second, other)]
+		assert not core.jobs["running"]
+		co, sizes = results[0][3].result()
+		expected = core.pattern_array(core.unit_params(other))
+		assert np.array_equal(co, expected[0]) and np.array_equal(sizes, expected[1])
+	finally:
+		core.job_shutdown()
+		core.cache_clear()